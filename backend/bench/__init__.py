@@ -0,0 +1 @@
+# Benchmarks and budgets for the backend
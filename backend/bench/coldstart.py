@@ -0,0 +1,103 @@
+"""
+RAKSHAK Backend — Cold-Start Import Budget
+
+Imports a module in a fresh interpreter with `python -X importtime`, reports
+the slowest imports and exits non-zero when the total (or any single
+module) is over budget. Run from backend/:
+
+    python -m bench.coldstart                         # handler, default budget
+    python -m bench.coldstart --budget-ms 80 --top 15
+    python -m bench.coldstart --module routes.alerts --budget-ms 600
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START_BUDGET_MS = float(os.environ.get("COLD_START_BUDGET_MS", "60"))
+
+# Modules that must never load just from importing the handler
+FORBIDDEN_AT_INIT = ("pymongo", "bson", "boto3", "botocore", "jose", "cryptography", "requests")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure(module, runs=3):
+    """
+    Import `module` in fresh interpreters and keep the fastest run.
+    `module=None` measures bare interpreter start-up.
+
+    Returns:
+        list of (module name, self µs, cumulative µs, depth), import order
+    """
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "WARMUP_ON_INIT": "0"},
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+
+        rows = []
+        for line in proc.stderr.splitlines():
+            match = _LINE_RE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+        total = sum(r[1] for r in rows)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cold-start import time against a budget")
+    parser.add_argument("--module", default="handler", help="module to import (default: handler)")
+    parser.add_argument("--budget-ms", type=float, default=COLD_START_BUDGET_MS,
+                        help="max total import time in ms (env COLD_START_BUDGET_MS)")
+    parser.add_argument("--module-budget-ms", type=float, default=None,
+                        help="max cumulative import time for any single top-level import")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to try (fastest wins)")
+    args = parser.parse_args(argv)
+
+    # Whatever the bare interpreter already imports (site, .pth hooks) is
+    # not part of our cold start
+    startup = {r[0] for r in measure(None, 1)}
+    rows = [r for r in measure(args.module, args.runs) if r[0] not in startup]
+    total_ms = sum(r[1] for r in rows) / 1000
+
+    print(f"Cold-start imports for '{args.module}': {total_ms:.1f}ms across {len(rows)} modules")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"total {total_ms:.1f}ms exceeds budget {args.budget_ms:.1f}ms")
+    if args.module_budget_ms is not None:
+        for name, _, cumulative_us, depth in rows:
+            if depth == 1 and cumulative_us / 1000 > args.module_budget_ms:
+                failures.append(f"{name} takes {cumulative_us / 1000:.1f}ms "
+                                f"(module budget {args.module_budget_ms:.1f}ms)")
+    if args.module == "handler":
+        loaded = {r[0].split(".")[0] for r in rows}
+        failures.extend(f"{m} is imported at init" for m in FORBIDDEN_AT_INIT if m in loaded)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK: within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
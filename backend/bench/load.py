@@ -0,0 +1,469 @@
+"""
+RAKSHAK Backend — In-Process Load Benchmark
+
+Drives handler.lambda_handler directly with synthetic API Gateway events
+for every route, with local stand-ins for every dependency:
+
+  MongoDB  — mongomock (pip install mongomock)
+  SES / S3 — in-memory fakes, or moto with --moto (pip install moto)
+  Cognito  — a throwaway RSA keypair; tokens are minted locally and the
+             JWKS manager is given the matching public key
+
+Reports p50/p95/p99 latency per route, throughput at each concurrency level
+and traced memory per request. Run from backend/:
+
+    python -m bench.load
+    python -m bench.load --requests 400 --concurrency 1,8,32 --save bench/baseline.json
+    python -m bench.load --compare bench/baseline.json --tolerance 0.25
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import platform
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+# Stand-ins need these before any backend module reads its configuration
+os.environ.setdefault("MONGODB_URI", "mongodb://bench.invalid/rakshak")
+os.environ.setdefault("COGNITO_REGION", "us-east-1")
+os.environ.setdefault("COGNITO_USER_POOL_ID", "us-east-1_bench")
+os.environ.setdefault("COGNITO_CLIENT_ID", "bench-client")
+os.environ.setdefault("SES_SENDER_EMAIL", "alerts@bench.local")
+os.environ["WARMUP_ON_INIT"] = "0"
+# Like Lambda: each worker thread serves one request at a time on its own loop
+os.environ.setdefault("ASYNC_OFFLOAD", "0")
+
+USERS = 50
+
+# Body "status" a successful response must report, per request label.
+# Bench users have guardians, so every simulate must reach the fan-out.
+EXPECTED_STATUS = {"POST /alert/simulate": ("delivered", "queued")}
+
+
+class FakeSES:
+    """Accepts every send; enough of the SES API for email_notify."""
+
+    def send_email(self, **kwargs):
+        return {"MessageId": uuid.uuid4().hex}
+
+    def get_template(self, **kwargs):
+        return {"Template": {}}
+
+    def create_template(self, **kwargs):
+        return {}
+
+    def send_bulk_templated_email(self, Destinations, **kwargs):
+        return {"Status": [{"Status": "Success", "MessageId": uuid.uuid4().hex} for _ in Destinations]}
+
+
+class FakeS3:
+    """Presigning plus multipart sessions that keep the parts they are given."""
+
+    def __init__(self):
+        self.uploads = {}  # UploadId -> {"Key", "Parts": {part number: ETag}}
+
+    def head_bucket(self, **kwargs):
+        return {}
+
+    def generate_presigned_url(self, operation, Params=None, ExpiresIn=300):
+        part = f"&part={Params['PartNumber']}" if "PartNumber" in Params else ""
+        return f"https://bench.local/{Params.get('Key', '')}?op={operation}&exp={ExpiresIn}{part}"
+
+    def create_multipart_upload(self, Key, **kwargs):
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {"Key": Key, "Parts": {}}
+        return {"UploadId": upload_id, "Key": Key}
+
+    def _upload(self, UploadId):
+        from botocore.exceptions import ClientError
+        upload = self.uploads.get(UploadId)
+        if upload is None:
+            raise ClientError({"Error": {"Code": "NoSuchUpload"}}, "Multipart")
+        return upload
+
+    def upload_part(self, UploadId, PartNumber, Body, **kwargs):
+        """What a client's PUT to a presigned part URL does."""
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        self._upload(UploadId)["Parts"][PartNumber] = etag
+        return {"ETag": etag}
+
+    def list_parts(self, UploadId, **kwargs):
+        parts = self._upload(UploadId)["Parts"]
+        return {
+            "Parts": [{"PartNumber": n, "ETag": etag, "Size": 0} for n, etag in sorted(parts.items())],
+            "IsTruncated": False,
+        }
+
+    def complete_multipart_upload(self, UploadId, MultipartUpload, **kwargs):
+        from botocore.exceptions import ClientError
+        stored = self._upload(UploadId)["Parts"]
+        for part in MultipartUpload["Parts"]:
+            if stored.get(part["PartNumber"]) != part["ETag"]:
+                raise ClientError({"Error": {"Code": "InvalidPart"}}, "CompleteMultipartUpload")
+        return {"Key": self.uploads.pop(UploadId)["Key"]}
+
+    def abort_multipart_upload(self, UploadId, **kwargs):
+        self.uploads.pop(UploadId, None)
+        return {}
+
+
+def install_stand_ins(use_moto=False):
+    """Point db.py, the AWS client registry and the JWKS manager at local stand-ins."""
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("bench.load needs mongomock: pip install mongomock")
+
+    import db
+    db._client = mongomock.MongoClient()
+    db._db = db._client[os.environ.get("MONGODB_DB", "rakshak")]
+    from indexes import ensure_indexes
+    ensure_indexes(db._db)
+
+    from utils import aws_clients
+    aws_clients.reset_clients()
+    if use_moto:
+        from moto import mock_aws
+        mock = mock_aws()
+        mock.start()
+        aws_clients.get_client("ses").verify_email_identity(EmailAddress=os.environ["SES_SENDER_EMAIL"])
+        aws_clients.get_client("s3").create_bucket(Bucket=os.environ.get("S3_EVIDENCE_BUCKET", "rakshak-evidence"))
+    else:
+        aws_clients.set_client("ses", FakeSES())
+        aws_clients.set_client("s3", FakeS3())
+
+    return _install_jwks()
+
+
+def _install_jwks():
+    """Generate a keypair, serve its public half as the JWKS, return a minting function."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jose import jwk, jwt
+    from utils.jwks import JWKSManager, set_jwks_manager
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    public.update(kid="bench-key", use="sig")
+    set_jwks_manager(JWKSManager(jwks={"keys": [public]}))
+
+    issuer = (f"https://cognito-idp.{os.environ['COGNITO_REGION']}.amazonaws.com/"
+              f"{os.environ['COGNITO_USER_POOL_ID']}")
+
+    def mint(sub):
+        claims = {
+            "sub": sub,
+            "aud": os.environ["COGNITO_CLIENT_ID"],
+            "iss": issuer,
+            "token_use": "id",
+            "exp": int(time.time()) + 3600,
+        }
+        return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": "bench-key"})
+
+    return mint
+
+
+def _event(method, path, token=None, body=None, query=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return {
+        "httpMethod": method,
+        "path": path,
+        "headers": headers,
+        "queryStringParameters": query,
+        "pathParameters": None,
+        "body": json.dumps(body) if body is not None else None,
+        "requestContext": {},
+    }
+
+
+def build_scenarios(tokens):
+    """
+    route label -> function(i) returning the events for one iteration.
+    Every user is seeded with one or two guardians, so alerts go through
+    the fan-out (SES bulk sends with two) and, in outbox mode, the outbox.
+    Guardian writes run as add -> update -> delete so the 3-guardian cap
+    never trips. Evidence sessions alternate between create -> resume ->
+    abort of a large upload and create -> upload the part -> complete of a
+    small one, after which the evidence must be linked to its alert.
+    """
+    def user(i):
+        return tokens[i % len(tokens)]
+
+    def guardian_writes(i):
+        token = user(i)
+
+        def path(responses):
+            created = json.loads(responses[0]["body"]).get("guardian", {})
+            return f"/user/guardians/{created.get('id')}"
+
+        return [
+            _event("POST", "/user/guardians", token, {"name": "Bench", "email": f"g{i}@bench.local"}),
+            lambda responses: _event("PUT", path(responses), token, {"name": "Bench 2"}),
+            lambda responses: _event("DELETE", path(responses), token),
+        ]
+
+    from bson import ObjectId
+    from jose import jwt
+    from db import get_collection
+    subs = [jwt.get_unverified_claims(token)["sub"] for token in tokens]
+    get_collection("guardian_sets").insert_many([
+        {"userId": sub, "guardians": [
+            {"_id": ObjectId(), "name": f"Guardian {g}", "email": f"{sub}-{g}@bench.local"}
+            for g in range(1 + n % 2)
+        ]}
+        for n, sub in enumerate(subs)
+    ])
+
+    # One alert per user for evidence sessions, seeded directly so the
+    # POST /alert/simulate row only measures the simulate scenario
+    alert_ids = get_collection("alerts").insert_many([
+        {"userId": sub, "location": {"lat": 12.97, "lng": 77.59}, "status": "no_guardians"}
+        for sub in subs
+    ]).inserted_ids
+
+    def evidence_session(i):
+        token = user(i)
+        alert_id = alert_ids[i % len(tokens)]
+        complete = i % 2 == 1
+
+        def evidence_path(responses):
+            return f"/evidence/{json.loads(responses[0]['body']).get('evidenceId')}"
+
+        def upload_parts(responses):
+            # Stands in for the client's PUTs to the presigned part URLs
+            from bson import ObjectId
+            from utils.aws_clients import get_client
+            created = json.loads(responses[0]["body"])
+            upload = get_collection("evidence_uploads").find_one({"_id": ObjectId(created["evidenceId"])})
+            s3 = get_client("s3")
+            for part in created["parts"]:
+                s3.upload_part(
+                    Bucket=os.environ.get("S3_EVIDENCE_BUCKET", "rakshak-evidence"), Key=upload["objectKey"],
+                    UploadId=upload["uploadId"], PartNumber=part["partNumber"], Body=b"\0" * upload["size"],
+                )
+            # No part list: the route asks S3 what it has
+            return _event("POST", evidence_path(responses) + "/complete", token, {})
+
+        def check_linked(responses):
+            key = json.loads(responses[-1]["body"]).get("objectKey")
+            alert = get_collection("alerts").find_one({"_id": alert_id, "evidence.key": key}, {"_id": 1})
+            if responses[-1]["statusCode"] != 200 or alert is None:
+                raise AssertionError(f"Evidence {key} was not linked to alert {alert_id}")
+            return None
+
+        steps = [_event("POST", "/evidence", token, {
+            "alertId": str(alert_id),
+            "size": 1024 if complete else 40 * 1024 * 1024,
+            "contentType": "audio/webm", "extension": "webm",
+        })]
+        if complete:
+            return steps + [upload_parts, check_linked]
+        return steps + [
+            lambda responses: _event("GET", evidence_path(responses), token),
+            lambda responses: _event("DELETE", evidence_path(responses), token),
+        ]
+
+    return {
+        "OPTIONS *": lambda i: [_event("OPTIONS", "/alert/simulate")],
+        "GET /health?liveness": lambda i: [_event("GET", "/health", query={"mode": "liveness"})],
+        "GET /health": lambda i: [_event("GET", "/health")],
+        "GET /user/profile": lambda i: [_event("GET", "/user/profile", user(i))],
+        "PUT /user/profile": lambda i: [_event("PUT", "/user/profile", user(i), {"name": f"User {i}"})],
+        "GET /user/guardians": lambda i: [_event("GET", "/user/guardians", user(i))],
+        "guardian writes": guardian_writes,
+        "POST /alert/simulate": lambda i: [_event("POST", "/alert/simulate", user(i), {
+            "location": {"lat": 12.97, "lng": 77.59}, "detectionType": "voice_distress", "confidence": 0.9,
+        })],
+        "GET /alert/history": lambda i: [_event("GET", "/alert/history", user(i), query={"limit": "20"})],
+        "evidence uploads": evidence_session,
+    }
+
+
+def _run_iteration(lambda_handler, steps):
+    """
+    Run one scenario iteration; returns [(label, seconds, status)]. A step
+    may be a callable taking the earlier responses, for requests that
+    need an id an earlier one created; one returning None only checks
+    the earlier responses. Raises AssertionError when a response breaks
+    EXPECTED_STATUS or a check fails.
+    """
+    timings = []
+    responses = []
+    for step in steps:
+        event = step(responses) if callable(step) else step
+        if event is None:
+            continue
+        started = time.perf_counter()
+        response = lambda_handler(event, None)
+        elapsed = time.perf_counter() - started
+        responses.append(response)
+        label = f"{event['httpMethod']} {event.get('resource') or event['path']}"
+        timings.append((label, elapsed, response["statusCode"]))
+        expected = EXPECTED_STATUS.get(label)
+        if expected and response["statusCode"] == 200:
+            status = json.loads(response["body"]).get("status")
+            if status not in expected:
+                raise AssertionError(f"{label} reported {status!r}, expected one of {expected}")
+    return timings
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _summarize(samples, elapsed):
+    latencies = sorted(s[1] * 1000 for s in samples)
+    errors = sum(1 for s in samples if s[2] >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughputRps": round(len(samples) / elapsed, 1) if elapsed else 0,
+        "p50Ms": round(_percentile(latencies, 50), 3),
+        "p95Ms": round(_percentile(latencies, 95), 3),
+        "p99Ms": round(_percentile(latencies, 99), 3),
+    }
+
+
+def run_load(lambda_handler, scenarios, iterations, concurrency):
+    """Run every scenario `iterations` times at a concurrency level."""
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for label, build in scenarios.items():
+            started = time.perf_counter()
+            batches = pool.map(lambda i: _run_iteration(lambda_handler, build(i)), range(iterations))
+            samples = [t for batch in batches for t in batch]
+            elapsed = time.perf_counter() - started
+            by_request = {}
+            for sample in samples:
+                by_request.setdefault(sample[0], []).append(sample)
+            if len(by_request) == 1:
+                by_request = {label: samples}
+            for request_label, request_samples in by_request.items():
+                results[request_label] = _summarize(request_samples, elapsed)
+    return results
+
+
+def measure_memory(lambda_handler, scenarios, iterations=50):
+    """Average traced peak (KiB) and net retained blocks per request, single-threaded."""
+    results = {}
+    tracemalloc.start()
+    try:
+        for label, build in scenarios.items():
+            peaks, requests = [], 0
+            before_blocks = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+            for i in range(iterations):
+                baseline = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                requests += len(_run_iteration(lambda_handler, build(i)))
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            after_blocks = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+            results[label] = {
+                "peakKiBPerRequest": round(sum(peaks) / len(peaks) / 1024 / max(1, requests / iterations), 1),
+                "netBlocksPerRequest": round((after_blocks - before_blocks) / max(1, requests), 1),
+            }
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def compare(current, baseline, tolerance):
+    """List p95 regressions beyond tolerance (e.g. 0.2 = 20% slower)."""
+    regressions = []
+    for level, routes in current["load"].items():
+        for label, stats in routes.items():
+            old = baseline.get("load", {}).get(level, {}).get(label)
+            if not old or not old["p95Ms"]:
+                continue
+            change = stats["p95Ms"] / old["p95Ms"] - 1
+            marker = "REGRESSION" if change > tolerance else ""
+            print(f"  c={level:<4} {label:<28} p95 {old['p95Ms']:>8.2f} -> {stats['p95Ms']:>8.2f}ms "
+                  f"({change:+.0%}) {marker}")
+            if change > tolerance:
+                regressions.append((level, label, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark lambda_handler with local stand-ins")
+    parser.add_argument("--requests", type=int, default=200, help="iterations per route per concurrency level")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--delivery", choices=("outbox", "inline"), default="outbox",
+                        help="ALERT_DELIVERY_MODE for /alert/simulate")
+    parser.add_argument("--moto", action="store_true", help="use moto for SES/S3 instead of in-memory fakes")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--save", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown vs baseline")
+    args = parser.parse_args(argv)
+
+    os.environ["ALERT_DELIVERY_MODE"] = args.delivery
+    mint = install_stand_ins(use_moto=args.moto)
+
+    import handler
+    from utils.rate_limit import Rule
+    # The alert cool-down would turn most simulate calls into 429s
+    handler.ROUTE_LIMITS = {k: Rule.per(10 ** 9, 1) for k in handler.ROUTE_LIMITS}
+
+    tokens = [mint(f"bench-user-{n}") for n in range(USERS)]
+    scenarios = build_scenarios(tokens)
+    # Warm every route once (lazy imports, template loads, token cache)
+    run_load(handler.lambda_handler, scenarios, 2, 1)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "delivery": args.delivery,
+            "stand_ins": "moto" if args.moto else "fakes",
+            "requestsPerRoute": args.requests,
+            "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "load": {},
+    }
+    for level in (int(c) for c in args.concurrency.split(",")):
+        results = run_load(handler.lambda_handler, scenarios, args.requests, level)
+        report["load"][str(level)] = results
+        print(f"\nconcurrency {level}")
+        print(f"  {'route':<28} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}")
+        for label, s in results.items():
+            print(f"  {label:<28} {s['throughputRps']:>8.1f} {s['p50Ms']:>7.2f}ms {s['p95Ms']:>7.2f}ms "
+                  f"{s['p99Ms']:>7.2f}ms {s['errors']:>5}")
+
+    if not args.no_memory:
+        report["memory"] = measure_memory(handler.lambda_handler, scenarios)
+        print("\nmemory per request")
+        for label, m in report["memory"].items():
+            print(f"  {label:<28} peak {m['peakKiBPerRequest']:>8.1f} KiB   net blocks {m['netBlocksPerRequest']:>7.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nComparison with {args.compare}")
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
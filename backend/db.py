@@ -1,12 +1,22 @@
 """
 RAKSHAK Backend — MongoDB Atlas Connection
+
+get_db()/get_collection() return synchronous pymongo objects.
+get_async_db()/get_async_collection() return Motor objects when motor is
+installed, otherwise the same pymongo collections behind an awaitable
+adapter that runs each call through utils.aio.offload.
 """
 
 import os
-from pymongo import MongoClient
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
 
 _client = None
 _db = None
+# Motor clients are bound to the event loop they were created on
+_async_dbs = weakref.WeakKeyDictionary()
 
 
 def get_db():
@@ -17,11 +27,114 @@ def get_db():
         db_name = os.environ.get("MONGODB_DB", "rakshak")
         if not uri:
             raise RuntimeError("MONGODB_URI environment variable is not set")
-        _client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+        from pymongo import MongoClient
+        from utils.tracing import mongo_listener
+        _client = MongoClient(uri, serverSelectionTimeoutMS=5000, event_listeners=[mongo_listener()])
         _db = _client[db_name]
+        if os.environ.get("MONGODB_AUTO_INDEX", "1") == "1":
+            _bootstrap_indexes(_db)
     return _db
 
 
+def _bootstrap_indexes(db):
+    """Ensure declared indexes once per cold start; never fails the request."""
+    from indexes import ensure_indexes
+    try:
+        ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Index bootstrap failed: {e}")
+
+
+def get_client():
+    """Get the shared MongoClient behind get_db()."""
+    get_db()
+    return _client
+
+
 def get_collection(name):
     """Get a MongoDB collection by name."""
     return get_db()[name]
+
+
+class _AsyncCursor:
+    """Chains find()/aggregate() modifiers; to_list() runs the query off the loop."""
+
+    def __init__(self, collection, method, args, kwargs):
+        self._collection = collection
+        self._method = method
+        self._args = args
+        self._kwargs = kwargs
+        self._modifiers = []
+
+    def __getattr__(self, name):
+        def modifier(*args, **kwargs):
+            self._modifiers.append((name, args, kwargs))
+            return self
+        return modifier
+
+    def _fetch(self, length):
+        cursor = getattr(self._collection, self._method)(*self._args, **self._kwargs)
+        for name, args, kwargs in self._modifiers:
+            cursor = getattr(cursor, name)(*args, **kwargs)
+        if length is None:
+            return list(cursor)
+        return [doc for doc, _ in zip(cursor, range(length))]
+
+    async def to_list(self, length=None):
+        from utils.aio import offload
+        return await offload(self._fetch, length)
+
+
+class _AsyncCollection:
+    """Motor-style awaitable view of a pymongo collection."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return _AsyncCursor(self._collection, "find", args, kwargs)
+
+    def aggregate(self, *args, **kwargs):
+        return _AsyncCursor(self._collection, "aggregate", args, kwargs)
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            from utils.aio import offload
+            return await offload(method, *args, **kwargs)
+        return call
+
+
+class _AsyncDatabase:
+    def __init__(self, db):
+        self._db = db
+
+    def __getitem__(self, name):
+        return _AsyncCollection(self._db[name])
+
+
+def get_async_db():
+    """Async database handle for the running event loop (lazy, one per loop)."""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    adb = _async_dbs.get(loop)
+    if adb is None:
+        db = get_db()
+        try:
+            from motor.motor_asyncio import AsyncIOMotorClient
+        except ImportError:
+            adb = _AsyncDatabase(db)
+        else:
+            from utils.tracing import mongo_listener
+            client = AsyncIOMotorClient(
+                os.environ["MONGODB_URI"], serverSelectionTimeoutMS=5000, event_listeners=[mongo_listener()]
+            )
+            adb = client[db.name]
+        _async_dbs[loop] = adb
+    return adb
+
+
+def get_async_collection(name):
+    """Get an async MongoDB collection by name."""
+    return get_async_db()[name]
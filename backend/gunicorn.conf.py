@@ -0,0 +1,39 @@
+"""
+RAKSHAK Backend — Gunicorn Configuration
+
+    gunicorn -c gunicorn.conf.py server:app
+
+Workers are forked before the app is imported (no preload), so every
+worker opens its own MongoDB pool, which pymongo requires after fork.
+Each worker then warms up (imports, Mongo ping, JWKS fetch) before it
+accepts traffic.
+"""
+
+import os
+import logging
+import multiprocessing
+
+from server import load_env
+
+load_env()
+# Each gthread thread already serves one request at a time on its own loop
+os.environ.setdefault("ASYNC_OFFLOAD", "0")
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '3001')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# Threads per worker — requests mostly wait on MongoDB/SES
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", "4"))
+timeout = int(os.environ.get("WEB_TIMEOUT", "30"))
+keepalive = int(os.environ.get("WEB_KEEPALIVE", "5"))
+preload_app = False
+accesslog = "-" if os.environ.get("WEB_ACCESS_LOG", "0") == "1" else None
+loglevel = os.environ.get("WEB_LOG_LEVEL", "info")
+
+
+def post_worker_init(worker):
+    """Prewarm each worker once its copy of the app is loaded."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    import handler
+    if os.environ.get("WARMUP_ON_INIT") != "1":  # otherwise it ran on import
+        handler.warm_up()
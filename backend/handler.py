@@ -1,32 +1,57 @@
 """
 RAKSHAK Backend — Main Lambda Handler
 Routes API Gateway requests to the correct handler.
+
+async_lambda_handler is the request path; lambda_handler runs it on the
+thread's persistent event loop for the Lambda runtime.
 """
 
+import os
 import json
+import math
+import base64
 import logging
 import time
 
-from utils.jwt_verify import verify_token
-from routes.user import handle_profile
-from routes.guardians import handle_guardians
-from routes.alerts import handle_simulate, handle_history
-from routes.health import handle_health
+# Only lightweight modules are imported here. Route modules and their heavy
+# dependencies (pymongo/bson, boto3/botocore, jose/cryptography) load on the
+# first request that needs them — see router.lazy and bench/coldstart.py.
+from router import Router, blocking, lazy, resolve
+from utils import tracing
+from utils.compression import compress_response
+from utils.aio import offload, run_sync
+from utils.rate_limit import Rule, get_rate_limiter, parse_limits
+from utils.serialize import dumps, to_bytes, to_text
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Simple in-memory rate limiter for alert simulation
-_rate_limit = {}  # user_sub -> last_alert_timestamp
-RATE_LIMIT_SECONDS = 10
+# Per-route, per-user limits; RATE_LIMITS overrides/extends the defaults
+ROUTE_LIMITS = {
+    "POST /alert/simulate": Rule.per(1, 10),
+    **parse_limits(os.environ.get("RATE_LIMITS")),
+}
+
+# Routes that honour an Idempotency-Key header (see utils/idempotency.py)
+IDEMPOTENT_ROUTES = {"POST /alert/simulate"}
+
+# Dashboard reads answered 304 on a matching If-None-Match, by data scope
+# (see utils/conditional.py). /alert/nearby is left out: its default window
+# moves with the clock.
+CONDITIONAL_ROUTES = {
+    "GET /user/profile": "profile",
+    "GET /user/guardians": "guardians",
+    "GET /alert/history": "alerts",
+}
 
 
 def _cors_headers():
     """Return CORS headers for all responses."""
     return {
         "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Headers": "Content-Type,Authorization",
+        "Access-Control-Allow-Headers": "Content-Type,Authorization,Idempotency-Key,If-None-Match",
         "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
+        "Access-Control-Expose-Headers": "Server-Timing,X-Request-Id,Idempotent-Replayed,Retry-After,ETag",
         "Content-Type": "application/json",
     }
 
@@ -36,40 +61,29 @@ def _response(status_code, body):
     return {
         "statusCode": status_code,
         "headers": _cors_headers(),
-        "body": json.dumps(body) if isinstance(body, dict) else body,
+        "body": dumps(body) if isinstance(body, dict) else body,
     }
 
 
-def _get_user_sub(event):
+async def _get_user_sub(event):
     """Extract and verify user identity from Authorization header."""
     auth_header = (event.get("headers") or {}).get("Authorization", "")
     if not auth_header:
         auth_header = (event.get("headers") or {}).get("authorization", "")
-    claims = verify_token(auth_header)
+    with tracing.phase("auth"):
+        from utils.jwt_verify import cached_claims, verify_token
+        claims = cached_claims(auth_header)
+        if claims is None:
+            # JWKS fetches and the RSA check stay off the event loop
+            claims = await offload(verify_token, auth_header)
     return claims.get("sub")
 
 
-def lambda_handler(event, context):
-    """Main Lambda entry point — dispatches to route handlers."""
-    method = event.get("httpMethod", "")
-    path = event.get("path", "")
-
-    logger.info(f"Request: {method} {path}")
-
-    # Handle CORS preflight
-    if method == "OPTIONS":
-        return _response(200, {"message": "OK"})
-
-    try:
-        # ── Health (public) ──
-        if path == "/health" and method == "GET":
-            result = handle_health(event)
-            result["headers"] = _cors_headers()
-            return result
-
-        # ── Protected routes — require JWT ──
+def _protected(route_handler):
+    """Wrap a handler(event, user_sub) so it runs only for a verified user."""
+    async def handler(event):
         try:
-            user_sub = _get_user_sub(event)
+            user_sub = await _get_user_sub(event)
         except Exception as auth_err:
             logger.warning(f"Auth failed: {auth_err}")
             return _response(401, {"message": "Unauthorized. Please log in."})
@@ -77,47 +91,161 @@ def lambda_handler(event, context):
         if not user_sub:
             return _response(401, {"message": "Invalid token."})
 
+        async def run():
+            with tracing.phase("ratelimit"):
+                if get_rate_limiter().blocking:
+                    limited = await offload(_check_rate_limit, event, user_sub)
+                else:
+                    limited = _check_rate_limit(event, user_sub)
+            if limited:
+                return limited
+
+            with tracing.phase("route"):
+                scope = CONDITIONAL_ROUTES.get(route_key)
+                if scope is not None:
+                    from utils.conditional import conditional
+                    return await conditional(event, user_sub, scope, lambda: resolve(route_handler(event, user_sub)))
+                return await resolve(route_handler(event, user_sub))
+
+        # Replays are answered before rate limiting, so a retry of a request
+        # that already went through is never turned away with a 429
+        route_key = f"{event.get('httpMethod', '')} {event.get('resource', '')}"
+        if route_key in IDEMPOTENT_ROUTES:
+            from utils.idempotency import idempotent
+            return await idempotent(event, user_sub, run)
+        return await run()
+    return handler
+
+
+def _check_rate_limit(event, user_sub):
+    """Return a 429 response if the user is over this route's limit."""
+    route_key = f"{event.get('httpMethod', '')} {event.get('resource', '')}"
+    rule = ROUTE_LIMITS.get(route_key)
+    if rule is None:
+        return None
+
+    allowed, retry_after = get_rate_limiter().hit(f"{route_key}:{user_sub}", rule)
+    if allowed:
+        return None
+    wait_seconds = math.ceil(retry_after)
+    result = _response(429, {"message": f"Too many requests. Please wait {wait_seconds} seconds."})
+    result["headers"]["Retry-After"] = str(wait_seconds)
+    return result
+
+
+# ── Middleware ──
+
+async def _cors_middleware(event, call_next):
+    """Answer preflights and attach CORS headers to every response."""
+    if event.get("httpMethod") == "OPTIONS":
+        return _response(200, {"message": "OK"})
+    result = await call_next(event)
+    result["headers"] = {**_cors_headers(), **(result.get("headers") or {})}
+    return result
+
+
+async def _tracing_middleware(event, call_next):
+    """Trace the request: one JSON log line plus X-Request-Id / Server-Timing headers."""
+    trace, token = tracing.start(event)
+    result = await call_next(event)
+    trace.route = event.get("resource", "")
+    return tracing.finish(trace, token, result)
+
+
+async def _compression_middleware(event, call_next):
+    """gzip / brotli response bodies by Accept-Encoding (see utils/compression.py)."""
+    result = await call_next(event)
+    headers = event.get("headers") or {}
+    accept = headers.get("Accept-Encoding") or headers.get("accept-encoding")
+    with tracing.phase("compress"):
+        return compress_response(result, accept)
 
-        # ── User Profile ──
-        if path == "/user/profile":
-            result = handle_profile(event, user_sub)
-            result["headers"] = _cors_headers()
-            return result
-
-        # ── Guardians ──
-        if path.startswith("/user/guardians"):
-            # Extract guardian ID from path if present
-            parts = path.split("/")
-            if len(parts) >= 4 and parts[3]:
-                event["pathParameters"] = {"id": parts[3]}
-            result = handle_guardians(event, user_sub)
-            result["headers"] = _cors_headers()
-            return result
-
-        # ── Alert Simulation ──
-        if path == "/alert/simulate" and method == "POST":
-            # Rate limiting
-            now = time.time()
-            last = _rate_limit.get(user_sub, 0)
-            if now - last < RATE_LIMIT_SECONDS:
-                return _response(429, {
-                    "message": f"Please wait {RATE_LIMIT_SECONDS} seconds between alerts."
-                })
-            _rate_limit[user_sub] = now
-
-            result = handle_simulate(event, user_sub)
-            result["headers"] = _cors_headers()
-            return result
-
-        # ── Alert History ──
-        if path == "/alert/history" and method == "GET":
-            result = handle_history(event, user_sub)
-            result["headers"] = _cors_headers()
-            return result
-
-        # ── 404 ──
-        return _response(404, {"message": f"Route not found: {method} {path}"})
 
+async def _error_middleware(event, call_next):
+    """Map exceptions escaping a route to API responses."""
+    try:
+        return await call_next(event)
+    except json.JSONDecodeError:
+        return _response(400, {"message": "Request body must be valid JSON"})
     except Exception as e:
         logger.error(f"Unhandled error: {e}", exc_info=True)
         return _response(500, {"message": "Internal server error"})
+
+
+def _not_found(event):
+    return _response(404, {
+        "message": f"Route not found: {event.get('httpMethod', '')} {event.get('path', '')}"
+    })
+
+
+# ── Route table ──
+
+router = Router(not_found=_not_found)
+router.use(_tracing_middleware)
+router.use(_compression_middleware)
+router.use(_cors_middleware)
+router.use(_error_middleware)
+
+router.add("GET", "/health", blocking(lazy("routes.health:handle_health")))
+router.add(Router.ANY, "/user/profile", _protected(lazy("routes.user:handle_profile_async")))
+router.add(Router.ANY, "/user/guardians", _protected(lazy("routes.guardians:handle_guardians_async")))
+router.add(Router.ANY, "/user/guardians/{id}", _protected(lazy("routes.guardians:handle_guardians_async")))
+router.add("POST", "/alert/simulate", _protected(lazy("routes.alerts:handle_simulate_async")))
+router.add("GET", "/alert/history", _protected(lazy("routes.alerts:handle_history_async")))
+router.add("GET", "/alert/nearby", _protected(lazy("routes.alerts:handle_nearby_async")))
+router.add(Router.ANY, "/evidence", _protected(lazy("routes.evidence:handle_evidence_async")))
+router.add(Router.ANY, "/evidence/{id}", _protected(lazy("routes.evidence:handle_evidence_async")))
+router.add("POST", "/evidence/{id}/complete", _protected(lazy("routes.evidence:handle_evidence_async")))
+
+
+def warm_up():
+    """
+    Pay connection and import costs ahead of the first request: import
+    every route module, connect to MongoDB and fetch the JWKS. Runs during
+    Lambda init when WARMUP_ON_INIT=1 (init gets a full CPU burst); each
+    step is best-effort.
+    """
+    import importlib
+    started = time.perf_counter()
+    for module in ("asyncio", "routes.health", "routes.user", "routes.guardians", "routes.alerts",
+                   "routes.evidence", "utils.jwt_verify"):
+        importlib.import_module(module)
+    try:
+        from db import get_client
+        get_client().admin.command("ping")
+    except Exception as e:
+        logger.warning(f"Warm-up: MongoDB not reachable: {e}")
+    try:
+        from utils.jwks import get_jwks_manager
+        get_jwks_manager().prefetch()
+    except Exception as e:
+        logger.warning(f"Warm-up: JWKS prefetch failed: {e}")
+    logger.info(f"Warm-up finished in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+if os.environ.get("WARMUP_ON_INIT") == "1":
+    warm_up()
+
+
+async def async_lambda_handler(event, context):
+    """
+    Async entry point (ASGI / WSGI servers) — dispatches to route handlers.
+    Bodies are left as bytes or a streamable utils.serialize.JSONStream.
+    """
+    return await router.dispatch(event)
+
+
+def lambda_handler(event, context):
+    """Main Lambda entry point — runs async_lambda_handler to completion."""
+    # With binary media types enabled API Gateway base64-encodes request bodies too
+    if event.get("isBase64Encoded") and event.get("body"):
+        event["body"] = base64.b64decode(event["body"]).decode("utf-8")
+        event["isBase64Encoded"] = False
+    result = run_sync(async_lambda_handler(event, context))
+    # API Gateway needs the body as a str: compressed bodies go base64-encoded
+    if "Content-Encoding" in (result.get("headers") or {}):
+        result["body"] = base64.b64encode(to_bytes(result.get("body"))).decode("ascii")
+        result["isBase64Encoded"] = True
+    else:
+        result["body"] = to_text(result.get("body"))
+    return result
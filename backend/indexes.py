@@ -0,0 +1,170 @@
+"""
+RAKSHAK Backend — MongoDB Index Management
+
+Declares the indexes every hot query relies on and makes sure they exist.
+Runs once per cold start from db.get_db(), or by hand:
+
+    python indexes.py            # create missing indexes
+    python indexes.py --check    # report drift, exit 1 if any
+"""
+
+import os
+import sys
+import logging
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# collection -> list of (index name, key spec, extra options)
+INDEX_SPECS = {
+    "users": [
+        ("userId_1", [("userId", ASCENDING)], {}),
+    ],
+    "guardian_sets": [
+        # One document per user; unique so a capped add can never create a second
+        ("userId_1", [("userId", ASCENDING)], {"unique": True}),
+    ],
+    "guardians": [
+        # Legacy per-guardian docs: read once per user until migrations/guardian_sets.py has run
+        ("userId_1", [("userId", ASCENDING)], {}),
+    ],
+    "alerts": [
+        # Serves history: equality on userId, keyset sort on (timestamp, _id)
+        ("userId_1_timestamp_-1__id_-1",
+         [("userId", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+        # Serves /alert/nearby: $geoNear on geo, filtered by userId and a time window
+        ("userId_1_geo_2dsphere_timestamp_-1",
+         [("userId", ASCENDING), ("geo", GEOSPHERE), ("timestamp", DESCENDING)], {}),
+    ],
+    "evidence_uploads": [
+        # GET /evidence: a user's uploads by status, newest first (optionally per alert)
+        ("userId_1_status_1_createdAt_-1",
+         [("userId", ASCENDING), ("status", ASCENDING), ("createdAt", DESCENDING)], {}),
+    ],
+    "alert_outbox": [
+        # claim_batch: due pending jobs in nextAttemptAt order
+        ("status_1_nextAttemptAt_1", [("status", ASCENDING), ("nextAttemptAt", ASCENDING)], {}),
+        ("alertId_1", [("alertId", ASCENDING)], {}),
+    ],
+    "idempotency_keys": [
+        # _id is the claim ({user}:{route}:{key}); TTL drops records after IDEMPOTENCY_TTL_SECONDS
+        ("expiresAt_1", [("expiresAt", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    "rate_limits": [
+        # TTL: Mongo drops buckets once they would be full again
+        ("expiresAt_1", [("expiresAt", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+}
+
+
+# Index options that change behaviour, and so count as drift when they differ
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def ensure_indexes(db):
+    """
+    Create any missing declared indexes. Safe to call repeatedly —
+    createIndexes is a no-op for indexes that already match.
+
+    A collection whose indexes cannot be created (e.g. an existing index
+    with the same name but different options) is logged and skipped, so
+    the others still get theirs.
+
+    Returns:
+        dict collection -> error message for collections that failed
+    """
+    failed = {}
+    for coll_name, specs in INDEX_SPECS.items():
+        models = [IndexModel(keys, name=name, **opts) for name, keys, opts in specs]
+        try:
+            db[coll_name].create_indexes(models)
+        except Exception as e:
+            logger.error(f"Index creation failed on {coll_name}: {e}")
+            failed[coll_name] = str(e)
+    logger.info(f"Indexes ensured on {len(INDEX_SPECS) - len(failed)} of {len(INDEX_SPECS)} collections")
+    return failed
+
+
+def _options(index):
+    """The compared options of an index description or spec; unique/sparse False == absent."""
+    return {k: index[k] for k in COMPARED_OPTIONS if k in index and index[k] is not False}
+
+
+def index_drift(db):
+    """
+    Compare live indexes against INDEX_SPECS.
+
+    Returns:
+        dict collection -> {"missing": [...], "mismatched": [...], "extra": [...]}
+        containing only collections that drifted.
+    """
+    drift = {}
+    for coll_name, specs in INDEX_SPECS.items():
+        live = {ix["name"]: ix for ix in db[coll_name].list_indexes()}
+        live.pop("_id_", None)
+
+        missing, mismatched = [], []
+        for name, keys, opts in specs:
+            if name not in live:
+                missing.append(name)
+                continue
+            ix = live.pop(name)
+            if list(ix["key"].items()) != [(k, d) for k, d in keys] or _options(ix) != _options(opts):
+                mismatched.append(name)
+
+        report = {"missing": missing, "mismatched": mismatched, "extra": sorted(live)}
+        if any(report.values()):
+            drift[coll_name] = report
+    return drift
+
+
+def explain_index(collection, query, sort=None):
+    """
+    Name of the index the winning plan uses for a find, or None if the
+    planner chose a collection scan. Lets tests assert a query is indexed.
+    """
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+
+    stages = [plan]
+    while stages:
+        stage = stages.pop()
+        if stage.get("stage") == "IXSCAN":
+            return stage.get("indexName")
+        if "inputStage" in stage:
+            stages.append(stage["inputStage"])
+        stages.extend(stage.get("inputStages", []))
+    return None
+
+
+def main(argv=None):
+    """CLI entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage RAKSHAK MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="report drift without creating indexes")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    # Index creation is driven explicitly below, not by the cold-start hook
+    os.environ["MONGODB_AUTO_INDEX"] = "0"
+    from db import get_db
+    db = get_db()
+    if not args.check:
+        for coll_name, error in ensure_indexes(db).items():
+            print(f"{coll_name}: index creation failed: {error}")
+
+    drift = index_drift(db)
+    for coll_name, report in drift.items():
+        for kind, names in report.items():
+            for name in names:
+                print(f"{coll_name}: {kind} index {name}")
+    if not drift:
+        print("Indexes in sync")
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# One-off data migrations, run by hand: python -m migrations.<name> --help
@@ -0,0 +1,118 @@
+"""
+RAKSHAK Backend — Migrate Alerts to BSON Dates and GeoJSON
+
+Converts alerts written before timestamps were BSON dates and before the
+`geo` Point existed (see routes/alerts.py):
+
+  timestamp: "2026-01-02T03:04:05.678+00:00"  ->  ISODate(...)
+  location {lat, lng}                         ->  adds geo: {type: Point, coordinates: [lng, lat]}
+
+Online and batched: documents are walked in _id order, a batch at a time
+with an optional pause between batches. Each update is conditional on the
+value it read, so concurrent writers are never overwritten. Re-running
+only touches what is still unconverted.
+
+    python -m migrations.alert_geo_time --dry-run
+    python -m migrations.alert_geo_time --batch-size 1000 --pause 0.2
+"""
+
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Documents that still need either conversion
+PENDING = {
+    "$or": [
+        {"timestamp": {"$type": "string"}},
+        {"geo": {"$exists": False}, "location.lat": {"$type": "number"}, "location.lng": {"$type": "number"}},
+    ]
+}
+
+
+def _parse_timestamp(value):
+    try:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _conversion(doc):
+    """(filter, update) for one document, or None if nothing can be converted."""
+    from routes.alerts import geo_point
+
+    query, update = {"_id": doc["_id"]}, {}
+    if isinstance(doc.get("timestamp"), str):
+        ts = _parse_timestamp(doc["timestamp"])
+        if ts is not None:
+            query["timestamp"] = doc["timestamp"]
+            update["timestamp"] = ts
+    if "geo" not in doc:
+        point = geo_point(doc.get("location"))
+        if point is not None:
+            query["geo"] = {"$exists": False}
+            update["geo"] = point
+    return (query, {"$set": update}) if update else None
+
+
+def migrate(alerts, batch_size=500, pause=0.0, dry_run=False):
+    """Convert pending alerts; returns {"scanned", "converted", "skipped"}."""
+    from pymongo import UpdateOne
+
+    summary = {"scanned": 0, "converted": 0, "skipped": 0}
+    last_id = None
+    while True:
+        query = dict(PENDING)
+        if last_id is not None:
+            query = {"$and": [PENDING, {"_id": {"$gt": last_id}}]}
+        batch = list(
+            alerts.find(query, {"timestamp": 1, "location": 1, "geo": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        ops = []
+        for doc in batch:
+            conversion = _conversion(doc)
+            if conversion is None:
+                summary["skipped"] += 1  # unparseable timestamp / invalid position
+            else:
+                ops.append(UpdateOne(*conversion))
+        summary["scanned"] += len(batch)
+        if ops and not dry_run:
+            result = alerts.bulk_write(ops, ordered=False)
+            summary["converted"] += result.modified_count
+        elif dry_run:
+            summary["converted"] += len(ops)
+        logger.info(f"Migrated through _id {last_id}: {summary}")
+        if pause:
+            time.sleep(pause)
+    return summary
+
+
+def main(argv=None):
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Convert alert timestamps to dates and add GeoJSON points")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change")
+    parser.add_argument("--batch-size", type=int, default=500, help="documents per batch")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from db import get_collection
+    summary = migrate(get_collection("alerts"), args.batch_size, args.pause, args.dry_run)
+    verb = "Would convert" if args.dry_run else "Converted"
+    print(f"{verb} {summary['converted']} of {summary['scanned']} pending alert(s); "
+          f"{summary['skipped']} could not be converted")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
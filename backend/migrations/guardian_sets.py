@@ -0,0 +1,124 @@
+"""
+RAKSHAK Backend — Migrate Guardians to Per-User Sets
+
+Converts legacy per-guardian documents in `guardians` into one
+`guardian_sets` document per user (see routes/guardians.py). Guardian _ids
+are kept, so existing alert deliveries and outbox jobs still match.
+
+Idempotent: guardians already present in a user's set are skipped, so it
+can be re-run safely (e.g. once before and once after deploying). Users the
+API has already adopted lazily (routes.guardians._guardian_set) are skipped
+the same way.
+
+    python -m migrations.guardian_sets --dry-run
+    python -m migrations.guardian_sets
+    python -m migrations.guardian_sets --delete-legacy   # after verifying
+"""
+
+import sys
+import logging
+import argparse
+
+logger = logging.getLogger(__name__)
+
+def _legacy_by_user(legacy):
+    """Yield (userId, [guardian subdocuments]) in insertion order."""
+    from routes.guardians import legacy_guardian
+
+    pipeline = [
+        {"$sort": {"userId": 1, "_id": 1}},
+        {"$group": {"_id": "$userId", "guardians": {"$push": "$$ROOT"}}},
+    ]
+    for group in legacy.aggregate(pipeline, allowDiskUse=True):
+        yield group["_id"], [legacy_guardian(g) for g in group["guardians"]]
+
+
+def migrate(db, batch_size=500, dry_run=False):
+    """
+    Copy legacy guardians into guardian_sets. Returns a summary dict with
+    users, guardians copied, guardians already present and over-cap users.
+    """
+    from pymongo import UpdateOne
+    from routes.guardians import GUARDIAN_SETS, LEGACY_GUARDIANS, MAX_GUARDIANS
+
+    sets = db[GUARDIAN_SETS]
+    summary = {"users": 0, "copied": 0, "present": 0, "overCap": []}
+    ops = []
+
+    def flush():
+        if ops and not dry_run:
+            sets.bulk_write(ops, ordered=False)
+        ops.clear()
+
+    for user_sub, guardians in _legacy_by_user(db[LEGACY_GUARDIANS]):
+        summary["users"] += 1
+        existing = sets.find_one({"userId": user_sub}, {"guardians._id": 1}) or {}
+        present = {g["_id"] for g in existing.get("guardians", [])}
+        missing = [g for g in guardians if g["_id"] not in present]
+        summary["present"] += len(guardians) - len(missing)
+        if len(present) + len(missing) > MAX_GUARDIANS:
+            # Kept as-is; the cap only blocks further adds for this user
+            summary["overCap"].append(user_sub)
+        if not missing:
+            continue
+        summary["copied"] += len(missing)
+        ops.append(UpdateOne(
+            {"userId": user_sub},
+            # Same _id as sets the API creates (routes.guardians._guardian_set)
+            {"$push": {"guardians": {"$each": missing}}, "$setOnInsert": {"_id": user_sub}},
+            upsert=True,
+        ))
+        if len(ops) >= batch_size:
+            flush()
+    flush()
+    return summary
+
+
+def delete_legacy(db):
+    """Remove legacy guardian docs whose _id is present in the user's set."""
+    from routes.guardians import GUARDIAN_SETS, LEGACY_GUARDIANS
+
+    deleted = 0
+    for doc in db[GUARDIAN_SETS].find({}, {"userId": 1, "guardians._id": 1}):
+        ids = [g["_id"] for g in doc.get("guardians", [])]
+        if ids:
+            result = db[LEGACY_GUARDIANS].delete_many({"userId": doc["userId"], "_id": {"$in": ids}})
+            deleted += result.deleted_count
+    return deleted
+
+
+def main(argv=None):
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Migrate guardians into per-user guardian_sets")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change")
+    parser.add_argument("--batch-size", type=int, default=500, help="users per bulk write")
+    parser.add_argument("--delete-legacy", action="store_true",
+                        help="after migrating, delete legacy docs that are present in guardian_sets")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from db import get_db
+    from indexes import ensure_indexes
+    db = get_db()
+    # The unique userId index must exist before sets are written
+    from routes.guardians import GUARDIAN_SETS
+    failed = ensure_indexes(db)
+    if GUARDIAN_SETS in failed:
+        print(f"Cannot migrate: {GUARDIAN_SETS} indexes failed: {failed[GUARDIAN_SETS]}")
+        return 1
+
+    summary = migrate(db, batch_size=args.batch_size, dry_run=args.dry_run)
+    verb = "Would copy" if args.dry_run else "Copied"
+    print(f"{verb} {summary['copied']} guardian(s) for {summary['users']} user(s); "
+          f"{summary['present']} already migrated")
+    if summary["overCap"]:
+        print(f"{len(summary['overCap'])} user(s) have more than the guardian cap: "
+              f"{', '.join(map(str, summary['overCap'][:20]))}")
+
+    if args.delete_legacy and not args.dry_run:
+        print(f"Deleted {delete_legacy(db)} legacy guardian document(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+RAKSHAK Backend — Request Router
+
+Route patterns are compiled once, at registration, into:
+  - a (method, path) dict for static routes, and
+  - a (method, segment count) table for routes with {param} segments,
+so dispatch cost does not grow with the number of endpoints.
+
+Dispatch is async. Handlers may be coroutine functions or plain functions;
+wrap plain functions that block (network, disk) in blocking() so they run
+off the event loop.
+"""
+
+import importlib
+
+from utils.aio import offload
+
+
+def lazy(target):
+    """
+    Reference a handler as "package.module:function" without importing it.
+    The module is imported on the first call, so a cold start only pays
+    for the dependencies of routes that actually run.
+    """
+    module_name, _, attr = target.partition(":")
+    resolved = None
+
+    def handler(*args, **kwargs):
+        nonlocal resolved
+        if resolved is None:
+            resolved = getattr(importlib.import_module(module_name), attr)
+        return resolved(*args, **kwargs)
+
+    handler.target = target
+    return handler
+
+
+def blocking(handler):
+    """Adapt a synchronous, blocking handler(*args) for async dispatch."""
+    async def run(*args):
+        return await offload(handler, *args)
+
+    run.target = getattr(handler, "target", None)
+    return run
+
+
+async def resolve(result):
+    """Await a handler's result if it is awaitable."""
+    if hasattr(result, "__await__"):
+        return await result
+    return result
+
+
+class Route:
+    """A compiled route: method, pattern and handler(event) -> response (or awaitable)."""
+
+    __slots__ = ("method", "pattern", "handler", "segments")
+
+    def __init__(self, method, pattern, handler):
+        self.method = method
+        self.pattern = pattern
+        self.handler = handler
+        # Literal segments are stored as str, {param} segments as a 1-tuple
+        self.segments = tuple(
+            (seg[1:-1],) if seg.startswith("{") and seg.endswith("}") else seg
+            for seg in _split(pattern)
+        )
+
+    @property
+    def is_static(self):
+        return all(isinstance(seg, str) for seg in self.segments)
+
+    def match(self, parts):
+        """Return path params if the split path matches, else None."""
+        params = {}
+        for seg, part in zip(self.segments, parts):
+            if isinstance(seg, str):
+                if seg != part:
+                    return None
+            else:
+                params[seg[0]] = part
+        return params
+
+
+def _split(path):
+    return tuple(p for p in path.split("/") if p)
+
+
+class Router:
+    """Method + path dispatcher with a response middleware chain."""
+
+    ANY = "*"
+
+    def __init__(self, not_found):
+        self._static = {}
+        self._dynamic = {}
+        self._middleware = []
+        self._chain = None
+        self._not_found = not_found
+
+    def add(self, method, pattern, handler):
+        """Register handler(event) for method ("*" for any) and pattern."""
+        route = Route(method, pattern, handler)
+        if route.is_static:
+            self._static[(method, "/" + "/".join(route.segments))] = route
+        else:
+            self._dynamic.setdefault((method, len(route.segments)), []).append(route)
+        return route
+
+    def use(self, middleware):
+        """
+        Add async middleware(event, call_next) -> response, which awaits
+        call_next(event). The first middleware added is the outermost.
+        """
+        self._middleware.append(middleware)
+        self._chain = None
+
+    def match(self, method, path):
+        """Resolve (route, path params) for a request, or (None, None)."""
+        parts = _split(path)
+        normalized = "/" + "/".join(parts)
+        for m in (method, self.ANY):
+            route = self._static.get((m, normalized))
+            if route is not None:
+                return route, {}
+        for m in (method, self.ANY):
+            for route in self._dynamic.get((m, len(parts)), ()):
+                params = route.match(parts)
+                if params is not None:
+                    return route, params
+        return None, None
+
+    async def _endpoint(self, event):
+        route, params = self.match(event.get("httpMethod", ""), event.get("path", ""))
+        if route is None:
+            return await resolve(self._not_found(event))
+        if params:
+            event["pathParameters"] = {**(event.get("pathParameters") or {}), **params}
+        event["resource"] = route.pattern
+        return await resolve(route.handler(event))
+
+    def _build_chain(self):
+        call = self._endpoint
+        for mw in reversed(self._middleware):
+            call = (lambda m, nxt: lambda event: m(event, nxt))(mw, call)
+        return call
+
+    async def dispatch(self, event):
+        """Run the middleware chain and the matched route for an event."""
+        if self._chain is None:
+            self._chain = self._build_chain()
+        return await self._chain(event)
@@ -1,103 +1,351 @@
 """
 RAKSHAK Backend — Alert Simulation & History Routes
+
+Alerts store `timestamp` as a BSON date and, next to the client's
+`location` {lat, lng}, a GeoJSON `geo` Point for the 2dsphere index. API
+output is unchanged: ISO 8601 timestamps and `location` only. Older
+documents are converted by migrations/alert_geo_time.py; until then their
+`timestamp` is an ISO string, which MongoDB never compares with a date, so
+every time filter and cursor here also matches the string form.
 """
 
+import os
 import json
+import base64
 import logging
-from datetime import datetime, timezone
-from db import get_collection
-from utils.email_notify import send_alert_email
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from db import get_async_collection
+from utils.aio import offload
+from utils.channels import delivery_method
+from utils.fanout import notify_guardians
+from routes.guardians import load_guardians
+from utils.conditional import bump, data_version
+from utils.outbox import enqueue_alert_async, kick_worker_async, queued_deliveries
+from utils.serialize import JSONStream, dumps
 
 logger = logging.getLogger(__name__)
 
+# "outbox": queue notifications and return; "inline": fan out within the request
+ALERT_DELIVERY_MODE = os.environ.get("ALERT_DELIVERY_MODE", "outbox")
+
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 100
+HISTORY_FIELDS = {
+    "location", "detectionType", "confidence", "timestamp",
+    "deliveryMethod", "status", "guardiansNotified", "deliveries", "evidence",
+}
+
+NEARBY_DEFAULT_RADIUS_M = 1000
+NEARBY_MAX_RADIUS_M = 50000
+NEARBY_DEFAULT_HOURS = 24
+NEARBY_MAX_HOURS = 24 * 30
+
 
 def _serialize_alert(a):
-    """Convert MongoDB doc to JSON-safe dict."""
-    a["alertId"] = str(a.pop("_id"))
-    return a
+    """API view of an alert doc; ObjectIds and dates are left to the encoder."""
+    out = {k: v for k, v in a.items() if k != "_id" and k != "geo"}
+    out["alertId"] = a["_id"]
+    return out
+
+
+def geo_point(location):
+    """GeoJSON Point for a {lat, lng} dict, or None if it is not a valid position."""
+    try:
+        lat, lng = location["lat"], location["lng"]
+    except (KeyError, TypeError):
+        return None
+    if isinstance(lat, bool) or isinstance(lng, bool) or not isinstance(lat, (int, float)) \
+            or not isinstance(lng, (int, float)):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return {"type": "Point", "coordinates": [float(lng), float(lat)]}
 
 
-def handle_simulate(event, user_sub):
-    """Handle POST /alert/simulate — creates alert record and notifies guardians via email."""
+def _parse_time(value, name):
+    """Parse an ISO 8601 query param into an aware UTC datetime."""
+    try:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp")
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+async def handle_simulate_async(event, user_sub):
+    """
+    Handle POST /alert/simulate — creates alert record and notifies guardians
+    on each of their channels (email, SMS, webhook).
+    In outbox mode (default) notifications are queued and sent by worker.py.
+    """
     body = json.loads(event.get("body", "{}"))
     location = body.get("location", {"lat": 0, "lng": 0})
     detection_type = body.get("detectionType", "voice_distress")
     confidence = body.get("confidence", 0.0)
-    timestamp = datetime.now(timezone.utc).isoformat()
+    # BSON dates keep milliseconds; truncate so the response matches what is stored
+    now = datetime.now(timezone.utc)
+    created_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    timestamp = created_at.isoformat()
 
-    alerts = get_collection("alerts")
-    guardians_col = get_collection("guardians")
+    alerts = get_async_collection("alerts")
+    # Versioned: a guardian removed or changed in another container must
+    # never be alerted from this container's cached copy
+    user_guardians = await load_guardians(user_sub, version=await data_version(user_sub, "guardians"))
+    alert_data = {
+        "location": location,
+        "timestamp": timestamp,
+        "detectionType": detection_type,
+    }
+    queued = bool(user_guardians) and ALERT_DELIVERY_MODE != "inline"
+    method = delivery_method(user_guardians)
 
-    # Create alert record
+    # Create alert record — queued deliveries are written with it so a
+    # worker can never pick up a job before its alert exists
     alert_doc = {
         "userId": user_sub,
         "location": location,
         "detectionType": detection_type,
         "confidence": confidence,
-        "timestamp": timestamp,
-        "deliveryMethod": "email",
-        "status": "processing",
+        "timestamp": created_at,
+        "deliveryMethod": method,
+        "status": "queued" if queued else "processing",
         "guardiansNotified": 0,
+        "deliveries": queued_deliveries(user_guardians) if queued else [],
     }
-    result = alerts.insert_one(alert_doc)
+    # Alerts without a usable position are still stored; they just never match
+    # /alert/nearby. The {0, 0} placeholder above is not a position.
+    point = geo_point(location) if "location" in body else None
+    if point:
+        alert_doc["geo"] = point
+    if not user_guardians:
+        alert_doc["status"] = "no_guardians"
+    result = await alerts.insert_one(alert_doc)
     alert_id = str(result.inserted_id)
 
     logger.info(f"Alert {alert_id} created for user {user_sub}")
 
-    # Fetch user's guardians and send notifications
-    user_guardians = list(guardians_col.find({"userId": user_sub}))
-    notified = 0
-    delivery_status = "delivered"
-
-    for g in user_guardians:
-        email_result = send_alert_email(
-            guardian_email=g.get("email", ""),
-            guardian_name=g.get("name", "Guardian"),
-            alert_data={
-                "location": location,
-                "timestamp": timestamp,
-                "detectionType": detection_type,
-            },
+    delivery_status, notified = alert_doc["status"], 0
+    if queued:
+        await enqueue_alert_async(result.inserted_id, user_sub, user_guardians, alert_data)
+        await kick_worker_async()
+    elif user_guardians:
+        # The fan-out runs its sends on its own bounded pool; wait for it off the loop
+        delivery_status, notified, deliveries = await offload(_deliver_inline, user_guardians, alert_data)
+        await alerts.update_one(
+            {"_id": result.inserted_id},
+            {"$set": {
+                "status": delivery_status,
+                "guardiansNotified": notified,
+                "deliveries": deliveries,
+            }},
         )
-        if email_result.get("status") == "delivered":
-            notified += 1
-        else:
-            delivery_status = "partial"
-
-    if notified == 0 and len(user_guardians) > 0:
-        delivery_status = "failed"
-    elif len(user_guardians) == 0:
-        delivery_status = "no_guardians"
-
-    # Update alert record with final status
-    alerts.update_one(
-        {"_id": result.inserted_id},
-        {"$set": {
-            "status": delivery_status,
-            "guardiansNotified": notified,
-        }},
-    )
 
-    logger.info(f"Alert {alert_id}: {notified}/{len(user_guardians)} guardians notified")
+    await bump(user_sub, "alerts")
+    logger.info(f"Alert {alert_id}: {delivery_status}, {notified}/{len(user_guardians)} guardians notified")
 
     return {
         "statusCode": 200,
-        "body": json.dumps({
+        "body": dumps({
             "alertId": alert_id,
             "timestamp": timestamp,
-            "deliveryMethod": "email",
+            "deliveryMethod": method,
             "status": delivery_status,
             "guardiansNotified": notified,
+            "guardiansQueued": len(user_guardians) if queued else 0,
             "message": "Silent alert triggered successfully",
         }),
     }
 
 
-def handle_history(event, user_sub):
-    """Handle GET /alert/history — returns all alerts for the user."""
-    alerts = get_collection("alerts")
-    docs = list(alerts.find({"userId": user_sub}).sort("timestamp", -1).limit(50))
+def _deliver_inline(user_guardians, alert_data):
+    """Notify guardians within the request under the fan-out deadline."""
+    deliveries = notify_guardians(user_guardians, alert_data)
+    notified = sum(1 for d in deliveries if d.get("status") == "delivered")
+    if notified == 0:
+        delivery_status = "failed"
+    elif notified < len(user_guardians):
+        delivery_status = "partial"
+    else:
+        delivery_status = "delivered"
+    return delivery_status, notified, deliveries
+
+
+def _time_range(window):
+    """
+    Filter for a {"$gte"/"$lt"/...: datetime} window on timestamp that also
+    matches legacy ISO-string timestamps (written with isoformat(), which
+    orders like the dates as long as both are UTC with microseconds).
+    """
+    legacy = {op: ts.isoformat(timespec="microseconds") for op, ts in window.items()}
+    return {"$or": [{"timestamp": window}, {"timestamp": legacy}]}
+
+
+def _after_cursor(ts, last_id):
+    """
+    Filter for the alerts after (ts, last_id) in (timestamp, _id) descending
+    order. Dates sort before strings there, so every legacy string-timestamp
+    alert comes after any date cursor.
+    """
+    clauses = [
+        {"timestamp": {"$lt": ts}},
+        {"timestamp": ts, "_id": {"$lt": last_id}},
+    ]
+    if isinstance(ts, datetime):
+        clauses.append({"timestamp": {"$type": "string"}})
+    return {"$or": clauses}
+
+
+def _encode_cursor(doc):
+    """
+    Opaque keyset cursor from the last document's (timestamp, _id). Dates
+    are encoded as epoch milliseconds; ISO strings (documents not yet
+    migrated) pass through as strings.
+    """
+    ts = doc["timestamp"]
+    if isinstance(ts, datetime):
+        ts = int((ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).timestamp() * 1000)
+    raw = dumps({"t": ts, "id": doc["_id"]})
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """Inverse of _encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        ts = data["t"]
+        if isinstance(ts, int):
+            ts = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+        return ts, ObjectId(data["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _parse_limit(value):
+    """Client page size, clamped to 1..HISTORY_MAX_LIMIT."""
+    try:
+        limit = int(value) if value else HISTORY_DEFAULT_LIMIT
+    except ValueError:
+        limit = HISTORY_DEFAULT_LIMIT
+    return max(1, min(limit, HISTORY_MAX_LIMIT))
+
+
+def _parse_projection(fields):
+    """Projection for ?fields=a,b — unknown names are ignored."""
+    if not fields:
+        return {"geo": 0}
+    wanted = {f.strip() for f in fields.split(",")} & HISTORY_FIELDS
+    projection = {f: 1 for f in wanted}
+    # The cursor is built from these, so they are always fetched
+    projection["timestamp"] = 1
+    return projection
+
+
+async def handle_history_async(event, user_sub):
+    """
+    Handle GET /alert/history — returns the user's alerts, newest first.
+
+    Query params:
+        limit: page size (default 50, max 100)
+        cursor: nextCursor from the previous page
+        fields: comma-separated subset of alert fields to return
+        since, until: optional ISO 8601 bounds on the alert time
+    """
+    params = event.get("queryStringParameters") or {}
+    limit = _parse_limit(params.get("limit"))
+    projection = _parse_projection(params.get("fields"))
+
+    query = {"userId": user_sub}
+    filters = []
+    try:
+        window = {}
+        if params.get("since"):
+            window["$gte"] = _parse_time(params["since"], "since")
+        if params.get("until"):
+            window["$lt"] = _parse_time(params["until"], "until")
+    except ValueError as e:
+        return {"statusCode": 400, "body": dumps({"message": str(e)})}
+    if window:
+        filters.append(_time_range(window))
+    if params.get("cursor"):
+        try:
+            ts, last_id = _decode_cursor(params["cursor"])
+        except ValueError as e:
+            return {"statusCode": 400, "body": dumps({"message": str(e)})}
+        filters.append(_after_cursor(ts, last_id))
+    if filters:
+        query["$and"] = filters
+
+    alerts = get_async_collection("alerts")
+    # Fetch one extra document to learn whether another page exists
+    docs = await (
+        alerts.find(query, projection)
+        .sort([("timestamp", -1), ("_id", -1)])
+        .limit(limit + 1)
+        .to_list(None)
+    )
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = _encode_cursor(docs[-1]) if has_more else None
+
     return {
         "statusCode": 200,
-        "body": json.dumps({"alerts": [_serialize_alert(d) for d in docs]}),
+        "body": JSONStream("alerts", docs, _serialize_alert, nextCursor=next_cursor),
     }
+
+
+async def handle_nearby_async(event, user_sub):
+    """
+    Handle GET /alert/nearby — the user's alerts within a radius of a point
+    and a time window, nearest first.
+
+    Query params:
+        lat, lng: centre (required)
+        radius: metres (default 1000, max 50000)
+        since, until: ISO 8601 window (default: the NEARBY_DEFAULT_HOURS before until/now)
+        hours: window length when since is omitted (max 720)
+        limit: max results (default 50, max 100)
+    """
+    params = event.get("queryStringParameters") or {}
+    try:
+        center = {"lat": float(params["lat"]), "lng": float(params["lng"])}
+    except (KeyError, TypeError, ValueError):
+        center = None
+    point = geo_point(center) if center else None
+    if point is None:
+        return {"statusCode": 400, "body": dumps({"message": "lat and lng must be a valid position"})}
+
+    try:
+        radius = float(params.get("radius") or NEARBY_DEFAULT_RADIUS_M)
+        hours = float(params.get("hours") or NEARBY_DEFAULT_HOURS)
+    except ValueError:
+        return {"statusCode": 400, "body": dumps({"message": "radius and hours must be numbers"})}
+    radius = max(1.0, min(radius, NEARBY_MAX_RADIUS_M))
+    hours = max(0.0, min(hours, NEARBY_MAX_HOURS))
+    try:
+        until = _parse_time(params["until"], "until") if params.get("until") else datetime.now(timezone.utc)
+        since = _parse_time(params["since"], "since") if params.get("since") else until - timedelta(hours=hours)
+    except ValueError as e:
+        return {"statusCode": 400, "body": dumps({"message": str(e)})}
+    limit = _parse_limit(params.get("limit"))
+
+    alerts = get_async_collection("alerts")
+    docs = await alerts.aggregate([
+        {"$geoNear": {
+            "near": point,
+            "key": "geo",
+            "distanceField": "distanceMeters",
+            "maxDistance": radius,
+            "spherical": True,
+            "query": {"userId": user_sub, **_time_range({"$gte": since, "$lte": until})},
+        }},
+        {"$limit": limit},
+    ]).to_list(None)
+
+    for d in docs:
+        d["distanceMeters"] = round(d["distanceMeters"], 1)
+    body = JSONStream(
+        "alerts", docs, _serialize_alert,
+        center=center, radiusMeters=radius, since=since, until=until,
+    )
+    return {"statusCode": 200, "body": body}
@@ -0,0 +1,277 @@
+"""
+RAKSHAK Backend — Evidence Upload Routes
+
+Audio/video evidence goes straight from the client to S3 as a multipart
+upload; the API only manages the session:
+
+    POST   /evidence                  start an upload for one of the user's alerts
+    GET    /evidence                  the user's unfinished uploads (?alertId=, ?status=)
+    GET    /evidence/{id}             resume: parts S3 already has + URLs for the rest
+    POST   /evidence/{id}/complete    assemble the object and link it to the alert
+    DELETE /evidence/{id}             abort and free the stored parts
+
+Parts are PUT in parallel to presigned upload_part URLs. The URLs of an
+upload are cached (utils.cache) until shortly before they expire, so a
+client resuming after a dropped connection gets them without re-signing.
+"""
+
+import os
+import json
+import math
+import logging
+from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from botocore.exceptions import ClientError
+from db import get_async_collection
+from utils.cache import invalidate, presign_key, read_through
+from utils.conditional import bump
+from utils.s3_utils import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    list_uploaded_parts,
+    presign_upload_parts,
+)
+from utils.serialize import JSONStream, dumps
+
+logger = logging.getLogger(__name__)
+
+EVIDENCE_UPLOADS = "evidence_uploads"
+
+# S3 requires every part but the last to be at least 5 MiB, and at most 10000 parts
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+S3_MAX_PARTS = 10000
+
+EVIDENCE_PART_SIZE = max(S3_MIN_PART_SIZE, int(os.environ.get("EVIDENCE_PART_SIZE", str(8 * 1024 * 1024))))
+EVIDENCE_MAX_BYTES = int(os.environ.get("EVIDENCE_MAX_BYTES", str(512 * 1024 * 1024)))
+EVIDENCE_URL_EXPIRY = int(os.environ.get("EVIDENCE_URL_EXPIRY", "900"))
+# A cached URL is handed out only while it has at least this long left
+EVIDENCE_URL_MIN_REMAINING = int(os.environ.get("EVIDENCE_URL_MIN_REMAINING", "120"))
+
+CONTENT_TYPE_PREFIXES = ("audio/", "video/", "image/")
+LIST_LIMIT = 50
+
+# S3 errors that mean the client's part list is wrong or the upload is gone
+_COMPLETE_CONFLICTS = {"InvalidPart", "InvalidPartOrder", "EntityTooSmall", "NoSuchUpload"}
+
+
+def _serialize_upload(u):
+    """API view of an upload session; the S3 UploadId stays server-side."""
+    out = {k: v for k, v in u.items() if k not in ("_id", "userId", "uploadId")}
+    out["evidenceId"] = u["_id"]
+    return out
+
+
+def _parse_id(value):
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+def _part_plan(size):
+    """(part size, part count) for an object of size bytes."""
+    part_size = max(EVIDENCE_PART_SIZE, math.ceil(size / S3_MAX_PARTS))
+    return part_size, max(1, math.ceil(size / part_size))
+
+
+def _error(status, message, **fields):
+    return {"statusCode": status, "body": dumps({"message": message, **fields})}
+
+
+async def _part_urls(upload):
+    """{part number (str): url} for every part of an upload, via the cache."""
+    async def sign():
+        urls = presign_upload_parts(
+            upload["objectKey"], upload["uploadId"],
+            range(1, upload["partCount"] + 1), EVIDENCE_URL_EXPIRY,
+        )
+        return {str(n): url for n, url in urls.items()}
+    ttl = max(0, EVIDENCE_URL_EXPIRY - EVIDENCE_URL_MIN_REMAINING)
+    return await read_through(presign_key(upload["_id"]), sign, ttl=ttl)
+
+
+def _url_list(urls, skip=()):
+    return [{"partNumber": int(n), "url": url} for n, url in urls.items() if int(n) not in skip]
+
+
+async def handle_evidence_async(event, user_sub):
+    """Handle /evidence, /evidence/{id} and /evidence/{id}/complete"""
+    method = event.get("httpMethod", "GET")
+    resource = event.get("resource", "")
+    uploads = get_async_collection(EVIDENCE_UPLOADS)
+
+    if resource == "/evidence":
+        if method == "POST":
+            return await _create(event, user_sub, uploads)
+        if method == "GET":
+            return await _list(event, user_sub, uploads)
+        return _error(405, "Method not allowed")
+
+    evidence_id = _parse_id((event.get("pathParameters") or {}).get("id"))
+    if evidence_id is None:
+        return _error(404, "Evidence upload not found")
+    upload = await uploads.find_one({"_id": evidence_id, "userId": user_sub})
+    if upload is None:
+        return _error(404, "Evidence upload not found")
+
+    if resource == "/evidence/{id}/complete" and method == "POST":
+        return await _complete(event, user_sub, uploads, upload)
+    if resource == "/evidence/{id}":
+        if method == "GET":
+            return await _resume(upload)
+        if method == "DELETE":
+            return await _abort(uploads, upload)
+    return _error(405, "Method not allowed")
+
+
+async def _create(event, user_sub, uploads):
+    """POST /evidence — {alertId, size, contentType, extension?}"""
+    body = json.loads(event.get("body") or "{}")
+    alert_id = _parse_id(body.get("alertId"))
+    size = body.get("size")
+    content_type = (body.get("contentType") or "application/octet-stream").strip().lower()
+    extension = (body.get("extension") or "bin").strip().lower().lstrip(".")
+
+    if alert_id is None:
+        return _error(400, "alertId is required")
+    if isinstance(size, bool) or not isinstance(size, int) or size <= 0:
+        return _error(400, "size must be a positive number of bytes")
+    if size > EVIDENCE_MAX_BYTES:
+        return _error(400, f"Evidence files are limited to {EVIDENCE_MAX_BYTES} bytes")
+    if content_type != "application/octet-stream" and not content_type.startswith(CONTENT_TYPE_PREFIXES):
+        return _error(400, "contentType must be an audio, video or image type")
+    if not extension.isalnum() or len(extension) > 8:
+        return _error(400, "extension must be up to 8 letters or digits")
+
+    alert = await get_async_collection("alerts").find_one({"_id": alert_id, "userId": user_sub}, {"_id": 1})
+    if alert is None:
+        return _error(404, "Alert not found")
+
+    evidence_id = ObjectId()
+    object_key = f"evidence/{user_sub}/{alert_id}/{evidence_id}.{extension}"
+    part_size, part_count = _part_plan(size)
+    upload = {
+        "_id": evidence_id,
+        "userId": user_sub,
+        "alertId": alert_id,
+        "objectKey": object_key,
+        "uploadId": await create_multipart_upload(object_key, content_type),
+        "contentType": content_type,
+        "size": size,
+        "partSize": part_size,
+        "partCount": part_count,
+        "status": "uploading",
+        "createdAt": datetime.now(timezone.utc),
+    }
+    await uploads.insert_one(upload)
+    urls = await _part_urls(upload)
+
+    logger.info(f"Evidence upload {evidence_id} started for alert {alert_id}: {size} bytes in {part_count} part(s)")
+    return {
+        "statusCode": 201,
+        "body": dumps({
+            **_serialize_upload(upload),
+            "expiresIn": EVIDENCE_URL_EXPIRY,
+            "parts": _url_list(urls),
+        }),
+    }
+
+
+async def _list(event, user_sub, uploads):
+    """GET /evidence — the user's uploads, newest first (default: still uploading)."""
+    params = event.get("queryStringParameters") or {}
+    query = {"userId": user_sub, "status": params.get("status") or "uploading"}
+    if params.get("alertId"):
+        alert_id = _parse_id(params["alertId"])
+        if alert_id is None:
+            return _error(400, "Invalid alertId")
+        query["alertId"] = alert_id
+    docs = await uploads.find(query).sort("createdAt", -1).limit(LIST_LIMIT).to_list(None)
+    return {"statusCode": 200, "body": JSONStream("uploads", docs, _serialize_upload)}
+
+
+async def _resume(upload):
+    """GET /evidence/{id} — what S3 already has, and URLs for the missing parts."""
+    uploaded, parts = [], []
+    if upload["status"] == "uploading":
+        uploaded = await list_uploaded_parts(upload["objectKey"], upload["uploadId"])
+        done = {p["partNumber"] for p in uploaded}
+        parts = _url_list(await _part_urls(upload), skip=done)
+    return {
+        "statusCode": 200,
+        "body": dumps({
+            **_serialize_upload(upload),
+            "uploaded": uploaded,
+            "expiresIn": EVIDENCE_URL_EXPIRY,
+            "parts": parts,
+        }),
+    }
+
+
+async def _complete(event, user_sub, uploads, upload):
+    """POST /evidence/{id}/complete — {parts: [{partNumber, etag}]} (optional)."""
+    if upload["status"] == "complete":
+        return {"statusCode": 200, "body": dumps({"message": "Evidence uploaded", **_serialize_upload(upload)})}
+    if upload["status"] != "uploading":
+        return _error(409, f"Upload is {upload['status']}")
+
+    body = json.loads(event.get("body") or "{}")
+    parts = body.get("parts")
+    if parts is None:
+        # The client did not keep the ETags; ask S3 what it has
+        parts = await list_uploaded_parts(upload["objectKey"], upload["uploadId"])
+    try:
+        parts = [{"partNumber": int(p["partNumber"]), "etag": str(p["etag"])} for p in parts]
+    except (KeyError, TypeError, ValueError):
+        return _error(400, "parts must be a list of {partNumber, etag}")
+    missing = sorted(set(range(1, upload["partCount"] + 1)) - {p["partNumber"] for p in parts})
+    if missing:
+        return _error(409, "Upload is missing parts", missingParts=missing)
+
+    try:
+        await complete_multipart_upload(upload["objectKey"], upload["uploadId"], parts)
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code not in _COMPLETE_CONFLICTS:
+            raise
+        return _error(409, f"S3 rejected the upload: {code}")
+
+    completed_at = datetime.now(timezone.utc)
+    await uploads.update_one(
+        {"_id": upload["_id"], "status": "uploading"},
+        {"$set": {"status": "complete", "completedAt": completed_at}},
+    )
+    # Link the object to the alert once, even if complete is retried
+    await get_async_collection("alerts").update_one(
+        {"_id": upload["alertId"], "userId": user_sub, "evidence.key": {"$ne": upload["objectKey"]}},
+        {"$push": {"evidence": {
+            "evidenceId": upload["_id"],
+            "key": upload["objectKey"],
+            "contentType": upload["contentType"],
+            "size": upload["size"],
+            "uploadedAt": completed_at,
+        }}},
+    )
+    await invalidate(presign_key(upload["_id"]))
+    await bump(user_sub, "alerts")
+
+    logger.info(f"Evidence upload {upload['_id']} completed for alert {upload['alertId']}")
+    upload.update(status="complete", completedAt=completed_at)
+    return {"statusCode": 200, "body": dumps({"message": "Evidence uploaded", **_serialize_upload(upload)})}
+
+
+async def _abort(uploads, upload):
+    """DELETE /evidence/{id} — abort an unfinished upload."""
+    if upload["status"] == "complete":
+        return _error(409, "Upload is already complete")
+    if upload["status"] == "uploading":
+        await abort_multipart_upload(upload["objectKey"], upload["uploadId"])
+        await uploads.update_one(
+            {"_id": upload["_id"], "status": "uploading"},
+            {"$set": {"status": "aborted", "abortedAt": datetime.now(timezone.utc)}},
+        )
+        await invalidate(presign_key(upload["_id"]))
+        logger.info(f"Evidence upload {upload['_id']} aborted")
+    return {"statusCode": 200, "body": dumps({"message": "Upload aborted"})}
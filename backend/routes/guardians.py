@@ -1,46 +1,143 @@
 """
 RAKSHAK Backend — Guardian Management Routes
+
+Each user's guardians live in one guardian_sets document:
+
+    {"_id": <user sub>, "userId": ..., "guardians": [{"_id": ObjectId, "name", "email", ...}]}
+
+so a read is one indexed find_one and every write is one atomic update.
+Sets are created with the user's sub as _id, so there is never a second
+set for a user even without the unique userId index (indexes.py is
+optional: MONGODB_AUTO_INDEX=0). Writes first make sure the set exists,
+then add with a plain update whose filter carries the MAX_GUARDIANS cap
+(no element at index MAX_GUARDIANS - 1 yet), so concurrent adds cannot
+overshoot it.
+
+Legacy per-guardian documents (the `guardians` collection) are converted
+in bulk by migrations/guardian_sets.py. Until that has run, a user without
+a set is given one built from their legacy documents the first time they
+are read or written, so no guardian disappears in between.
 """
 
 import json
 import logging
 from bson import ObjectId
-from db import get_collection
+from pymongo.errors import DuplicateKeyError
+from db import get_async_collection
+from utils.aio import offload
+from utils.cache import guardians_key, invalidate, read_through
+from utils.channels import webhook_url_error
+from utils.conditional import bump, current_version
+from utils.serialize import JSONStream, dumps
 
 logger = logging.getLogger(__name__)
+GUARDIAN_SETS = "guardian_sets"
+LEGACY_GUARDIANS = "guardians"
+LEGACY_FIELDS = ("name", "email", "phone", "relationship", "channels", "webhookUrl")
 MAX_GUARDIANS = 3
+CHANNEL_NAMES = ("email", "sms", "webhook")
 
 
 def _serialize_guardian(g):
-    """Convert MongoDB document to JSON-safe dict."""
-    g["id"] = str(g.pop("_id"))
-    return g
-
-
-def handle_guardians(event, user_sub):
+    """API view of a guardian; the encoder handles ObjectId."""
+    out = {k: v for k, v in g.items() if k != "_id"}
+    out["id"] = g["_id"]
+    return out
+
+
+def _contact_fields(body):
+    """
+    Validate optional notification settings: a ranked "channels" list and
+    an https "webhookUrl" on a public host. Returns (fields, error message or None).
+    Resolves the webhook host, so callers run it with offload().
+    """
+    fields = {}
+    if "channels" in body:
+        channels = body["channels"]
+        if not isinstance(channels, list) or not all(c in CHANNEL_NAMES for c in channels):
+            return None, f"channels must be a list drawn from {', '.join(CHANNEL_NAMES)}"
+        fields["channels"] = list(dict.fromkeys(channels))
+    if "webhookUrl" in body:
+        url = (body["webhookUrl"] or "").strip()
+        error = webhook_url_error(url) if url else None
+        if error:
+            return None, error
+        fields["webhookUrl"] = url
+    return fields, None
+
+
+def legacy_guardian(doc):
+    """Set entry for a legacy per-guardian document; the _id is kept."""
+    return {"_id": doc["_id"], **{k: doc[k] for k in LEGACY_FIELDS if k in doc}}
+
+
+async def _guardian_set(guardian_sets, user_sub):
+    """
+    The user's guardian subdocuments. A user with no set yet gets one
+    (possibly empty) from their legacy documents, so the legacy collection
+    is only consulted once per user.
+    """
+    doc = await guardian_sets.find_one({"userId": user_sub}, {"_id": 0, "guardians": 1})
+    if doc is not None:
+        return doc.get("guardians", [])
+
+    legacy = await get_async_collection(LEGACY_GUARDIANS).find({"userId": user_sub}).sort("_id", 1).to_list(None)
+    guardians = [legacy_guardian(g) for g in legacy]
+    try:
+        result = await guardian_sets.update_one(
+            {"userId": user_sub}, {"$setOnInsert": {"_id": user_sub, "guardians": guardians}}, upsert=True
+        )
+        if result.upserted_id is not None:
+            if guardians:
+                logger.info(f"Adopted {len(guardians)} legacy guardian(s) for user {user_sub}")
+            return guardians
+    except DuplicateKeyError:
+        pass  # a concurrent request created the set first
+    doc = await guardian_sets.find_one({"userId": user_sub}, {"_id": 0, "guardians": 1})
+    return (doc or {}).get("guardians", [])
+
+
+async def load_guardians(user_sub, version=None):
+    """
+    The user's guardian documents (with string _id), served from the cache;
+    with a data version, only from an entry cached at that version.
+    """
+    async def load():
+        guardians = await _guardian_set(get_async_collection(GUARDIAN_SETS), user_sub)
+        return [{**g, "_id": str(g["_id"]), "userId": user_sub} for g in guardians]
+    return await read_through(guardians_key(user_sub), load, version=version)
+
+
+async def _push_guardian(guardian_sets, user_sub, doc):
+    """
+    Append doc unless the user already has MAX_GUARDIANS. Returns False
+    when the cap is reached. The set must exist (_guardian_set); a full
+    one simply fails the filter.
+    """
+    result = await guardian_sets.update_one(
+        {"userId": user_sub, f"guardians.{MAX_GUARDIANS - 1}": {"$exists": False}},
+        {"$push": {"guardians": doc}},
+    )
+    return result.modified_count == 1
+
+
+async def handle_guardians_async(event, user_sub):
     """Handle CRUD operations on /user/guardians"""
     method = event.get("httpMethod", "GET")
-    guardians = get_collection("guardians")
+    guardian_sets = get_async_collection(GUARDIAN_SETS)
     path = event.get("pathParameters") or {}
     guardian_id = path.get("id")
 
     # GET — list all guardians for user
     if method == "GET":
-        docs = list(guardians.find({"userId": user_sub}))
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"guardians": [_serialize_guardian(d) for d in docs]}),
-        }
+        docs = await load_guardians(user_sub, version=current_version())
+        return {"statusCode": 200, "body": JSONStream("guardians", docs, _serialize_guardian)}
+
+    # Writes act on the set, so bring over any legacy guardians first
+    await _guardian_set(guardian_sets, user_sub)
 
     # POST — add a new guardian
     if method == "POST":
-        existing_count = guardians.count_documents({"userId": user_sub})
-        if existing_count >= MAX_GUARDIANS:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"message": f"Maximum {MAX_GUARDIANS} guardians allowed"}),
-            }
-
         body = json.loads(event.get("body", "{}"))
         name = body.get("name", "").strip()
         email = body.get("email", "").strip()
@@ -50,24 +147,34 @@ def handle_guardians(event, user_sub):
         if not name or not email:
             return {
                 "statusCode": 400,
-                "body": json.dumps({"message": "Name and email are required"}),
+                "body": dumps({"message": "Name and email are required"}),
             }
 
+        contact, error = await offload(_contact_fields, body)
+        if error:
+            return {"statusCode": 400, "body": dumps({"message": error})}
+
         doc = {
-            "userId": user_sub,
+            "_id": ObjectId(),
             "name": name,
             "email": email,
             "phone": phone,
             "relationship": relationship,
+            **contact,
         }
-        result = guardians.insert_one(doc)
-        doc["id"] = str(result.inserted_id)
-        doc.pop("_id", None)
+        if not await _push_guardian(guardian_sets, user_sub, doc):
+            return {
+                "statusCode": 400,
+                "body": dumps({"message": f"Maximum {MAX_GUARDIANS} guardians allowed"}),
+            }
+        await invalidate(guardians_key(user_sub))
+        await bump(user_sub, "guardians")
+        doc = {"userId": user_sub, **_serialize_guardian(doc)}
 
         logger.info(f"Guardian added for user {user_sub}: {name}")
         return {
             "statusCode": 201,
-            "body": json.dumps({"message": "Guardian added", "guardian": doc}),
+            "body": dumps({"message": "Guardian added", "guardian": doc}),
         }
 
     # PUT — update guardian by ID
@@ -75,44 +182,54 @@ def handle_guardians(event, user_sub):
         body = json.loads(event.get("body", "{}"))
         allowed = ["name", "email", "phone", "relationship"]
         update = {k: v.strip() for k, v in body.items() if k in allowed and isinstance(v, str)}
+        contact, error = await offload(_contact_fields, body)
+        if error:
+            return {"statusCode": 400, "body": dumps({"message": error})}
+        update.update(contact)
 
         if not update:
             return {
                 "statusCode": 400,
-                "body": json.dumps({"message": "No valid fields to update"}),
+                "body": dumps({"message": "No valid fields to update"}),
             }
 
-        result = guardians.update_one(
-            {"_id": ObjectId(guardian_id), "userId": user_sub},
-            {"$set": update},
+        result = await guardian_sets.update_one(
+            {"userId": user_sub, "guardians._id": ObjectId(guardian_id)},
+            {"$set": {f"guardians.$.{k}": v for k, v in update.items()}},
         )
         if result.matched_count == 0:
             return {
                 "statusCode": 404,
-                "body": json.dumps({"message": "Guardian not found"}),
+                "body": dumps({"message": "Guardian not found"}),
             }
+        await invalidate(guardians_key(user_sub))
+        await bump(user_sub, "guardians")
 
         logger.info(f"Guardian {guardian_id} updated for user {user_sub}")
         return {
             "statusCode": 200,
-            "body": json.dumps({"message": "Guardian updated"}),
+            "body": dumps({"message": "Guardian updated"}),
         }
 
     # DELETE — remove guardian by ID
     if method == "DELETE" and guardian_id:
-        result = guardians.delete_one(
-            {"_id": ObjectId(guardian_id), "userId": user_sub}
+        guardian_oid = ObjectId(guardian_id)
+        result = await guardian_sets.update_one(
+            {"userId": user_sub, "guardians._id": guardian_oid},
+            {"$pull": {"guardians": {"_id": guardian_oid}}},
         )
-        if result.deleted_count == 0:
+        if result.matched_count == 0:
             return {
                 "statusCode": 404,
-                "body": json.dumps({"message": "Guardian not found"}),
+                "body": dumps({"message": "Guardian not found"}),
             }
+        await invalidate(guardians_key(user_sub))
+        await bump(user_sub, "guardians")
 
         logger.info(f"Guardian {guardian_id} deleted for user {user_sub}")
         return {
             "statusCode": 200,
-            "body": json.dumps({"message": "Guardian deleted"}),
+            "body": dumps({"message": "Guardian deleted"}),
         }
 
-    return {"statusCode": 405, "body": json.dumps({"message": "Method not allowed"})}
+    return {"statusCode": 405, "body": dumps({"message": "Method not allowed"})}
@@ -2,53 +2,118 @@
 RAKSHAK Backend — Health Check Route
 """
 
-import json
 import os
+import time
 import logging
-from db import get_db
-from utils.s3_utils import check_s3_ready
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from db import get_client
+from utils.serialize import dumps
 
 logger = logging.getLogger(__name__)
 
+HEALTH_CACHE_SECONDS = float(os.environ.get("HEALTH_CACHE_SECONDS", "15"))
+HEALTH_PROBE_TIMEOUT = float(os.environ.get("HEALTH_PROBE_TIMEOUT", "2"))
+VERSION = "1.0.0"
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="health")
+_probe_cache = None
+_probe_cached_at = 0
+_probe_lock = threading.Lock()
 
-def handle_health(event):
-    """Handle GET /health — returns system status."""
-    services = {
-        "api": "healthy",
-        "mongodb": "unknown",
-        "s3": "unknown",
-    }
 
-    # Check MongoDB
+def _probe_mongodb():
+    """Ping MongoDB over the shared db.py client."""
+    if not os.environ.get("MONGODB_URI"):
+        return {"mongodb": "not_configured"}
+    import pymongo
     try:
-        from pymongo import MongoClient
-        uri = os.environ.get("MONGODB_URI")
-        if uri:
-            client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+        # Outside the timeout: the first get_client() also builds indexes
+        # (db._bootstrap_indexes), which must not inherit the probe's deadline
+        client = get_client()
+        with pymongo.timeout(HEALTH_PROBE_TIMEOUT):
             client.admin.command("ping")
-            client.close()
-            services["mongodb"] = "connected"
-        else:
-            services["mongodb"] = "not_configured"
+        return {"mongodb": "connected"}
     except Exception as e:
-        services["mongodb"] = "disconnected"
-        services["mongodb_error"] = str(e)
         logger.error(f"MongoDB health check failed: {e}")
+        return {"mongodb": "disconnected", "mongodb_error": str(e)}
+
 
-    # Check S3
+def _probe_s3():
+    """Check the evidence bucket through the shared S3 client."""
     try:
-        services["s3"] = "ready" if check_s3_ready() else "not_configured"
+        from utils.s3_utils import check_s3_ready
+        return {"s3": "ready" if check_s3_ready() else "not_configured"}
     except Exception as e:
-        services["s3"] = "not_configured"
         logger.error(f"S3 health check failed: {e}")
+        return {"s3": "not_configured"}
+
+
+_PROBES = {
+    "mongodb": _probe_mongodb,
+    "s3": _probe_s3,
+}
+
+
+def _run_probes():
+    """Run every dependency probe in parallel, bounded by HEALTH_PROBE_TIMEOUT."""
+    futures = {_executor.submit(fn): name for name, fn in _PROBES.items()}
+    done, _ = wait(futures, timeout=HEALTH_PROBE_TIMEOUT + 0.5)
+
+    services = {}
+    for future, name in futures.items():
+        if future in done:
+            services.update(future.result())
+        else:
+            services[name] = "timeout"
+    return services
+
+
+def _cached_probes():
+    """Return probe results, re-running them at most once per HEALTH_CACHE_SECONDS."""
+    global _probe_cache, _probe_cached_at
+    with _probe_lock:
+        now = time.time()
+        if _probe_cache is None or (now - _probe_cached_at) >= HEALTH_CACHE_SECONDS:
+            _probe_cache = _run_probes()
+            _probe_cached_at = now
+        return dict(_probe_cache), now - _probe_cached_at
+
+
+def handle_health(event):
+    """
+    Handle GET /health — returns system status.
+
+    ?mode=liveness answers without touching any dependency and is always
+    200; the default readiness mode reports MongoDB and S3 from the probe
+    cache, and is 503 while MongoDB (required for every user route) is not
+    connected.
+    """
+    params = event.get("queryStringParameters") or {}
+    mode = params.get("mode", "readiness")
+
+    if mode == "liveness":
+        return {
+            "statusCode": 200,
+            "body": dumps({
+                "status": "healthy",
+                "mode": "liveness",
+                "version": VERSION,
+            }),
+        }
 
-    overall = "healthy" if services["mongodb"] == "connected" else "degraded"
+    services, age = _cached_probes()
+    services = {"api": "healthy", **services}
+    ready = services.get("mongodb") == "connected"
+    overall = "healthy" if ready else "degraded"
 
     return {
-        "statusCode": 200,
-        "body": json.dumps({
+        "statusCode": 200 if ready else 503,
+        "body": dumps({
             "status": overall,
+            "mode": "readiness",
             "services": services,
-            "version": "1.0.0",
+            "cacheAgeSeconds": round(age, 1),
+            "version": VERSION,
         }),
     }
@@ -4,21 +4,26 @@ RAKSHAK Backend — User Profile Routes
 
 import json
 import logging
-from db import get_collection
+from db import get_async_collection
+from utils.cache import invalidate, profile_key, read_through
+from utils.conditional import bump, current_version
+from utils.serialize import dumps
 
 logger = logging.getLogger(__name__)
 
 
-def handle_profile(event, user_sub):
+async def handle_profile_async(event, user_sub):
     """Handle GET/PUT /user/profile"""
     method = event.get("httpMethod", "GET")
-    users = get_collection("users")
+    users = get_async_collection("users")
 
     if method == "GET":
-        profile = users.find_one({"userId": user_sub}, {"_id": 0})
+        async def load():
+            return await users.find_one({"userId": user_sub}, {"_id": 0}) or {"userId": user_sub}
+        profile = await read_through(profile_key(user_sub), load, version=current_version())
         return {
             "statusCode": 200,
-            "body": json.dumps({"profile": profile or {"userId": user_sub}}),
+            "body": dumps({"profile": profile}),
         }
 
     elif method == "PUT":
@@ -29,19 +34,21 @@ def handle_profile(event, user_sub):
         if not update_data:
             return {
                 "statusCode": 400,
-                "body": json.dumps({"message": "No valid fields to update"}),
+                "body": dumps({"message": "No valid fields to update"}),
             }
 
         update_data["userId"] = user_sub
-        users.update_one(
+        await users.update_one(
             {"userId": user_sub},
             {"$set": update_data},
             upsert=True,
         )
+        await invalidate(profile_key(user_sub))
+        await bump(user_sub, "profile")
         logger.info(f"Profile updated for user {user_sub}")
         return {
             "statusCode": 200,
-            "body": json.dumps({"message": "Profile updated", "profile": update_data}),
+            "body": dumps({"message": "Profile updated", "profile": update_data}),
         }
 
-    return {"statusCode": 405, "body": json.dumps({"message": "Method not allowed"})}
+    return {"statusCode": 405, "body": dumps({"message": "Method not allowed"})}
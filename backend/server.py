@@ -0,0 +1,175 @@
+"""
+RAKSHAK Backend — WSGI / ASGI Server Adapters
+
+Serves the Lambda handler over plain HTTP for on-prem / container runs:
+
+    gunicorn -c gunicorn.conf.py server:app       # WSGI, threaded workers
+    uvicorn server:asgi_app --host 0.0.0.0 --port 3001 --workers 4
+
+The ASGI app awaits async_lambda_handler directly, so one process serves
+many requests concurrently while they wait on MongoDB and AWS.
+
+Each HTTP request is turned directly into an API Gateway proxy event and
+the handler's response is written back as-is. Bodies stay the bytes the
+routes encoded (and compressed); list responses (utils.serialize.JSONStream)
+are written chunk by chunk as they are encoded.
+"""
+
+import os
+import base64
+import logging
+from http.client import responses
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+
+# WSGI names that carry headers without the HTTP_ prefix
+_UNPREFIXED_HEADERS = {"CONTENT_TYPE": "Content-Type", "CONTENT_LENGTH": "Content-Length"}
+
+
+def load_env(path=ENV_FILE, override=False):
+    """
+    Load backend/.env into os.environ when python-dotenv is installed. By
+    default variables already set in the environment win (gunicorn, WSGI
+    hosts); run_local.py passes override=True, as it always has.
+    """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return False
+    return load_dotenv(path, override=override)
+
+
+def _headers(environ):
+    headers = {}
+    for key, value in environ.items():
+        if key.startswith("HTTP_"):
+            headers[key[5:].replace("_", "-").title()] = value
+        elif key in _UNPREFIXED_HEADERS and value:
+            headers[_UNPREFIXED_HEADERS[key]] = value
+    return headers
+
+
+def _body(environ):
+    try:
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = 0
+    if length <= 0:
+        return None
+    return environ["wsgi.input"].read(length).decode("utf-8", errors="replace")
+
+
+def _event(method, path, headers, query_string, body):
+    query = dict(parse_qsl(query_string, keep_blank_values=True))
+    return {
+        "httpMethod": method,
+        "path": path or "/",
+        "headers": headers,
+        "queryStringParameters": query or None,
+        "pathParameters": None,
+        "body": body,
+        "isBase64Encoded": False,
+        "requestContext": {},
+    }
+
+
+def to_event(environ):
+    """Build an API Gateway proxy event from a WSGI environ."""
+    return _event(
+        environ.get("REQUEST_METHOD", "GET"),
+        environ.get("PATH_INFO"),
+        _headers(environ),
+        environ.get("QUERY_STRING", ""),
+        _body(environ),
+    )
+
+
+def to_wsgi_response(result):
+    """
+    Convert a Lambda proxy response into (status line, header list, body
+    chunks). Streamed bodies are sent without a Content-Length.
+    """
+    from utils.serialize import to_bytes
+
+    status = int(result.get("statusCode", 200))
+    body = result.get("body")
+    headers = [(k, str(v)) for k, v in (result.get("headers") or {}).items()
+               if k.lower() != "content-length"]
+    if body is not None and not isinstance(body, (str, bytes)):
+        # JSONStream, or its compressed form
+        chunks = body
+    else:
+        body = base64.b64decode(body or b"") if result.get("isBase64Encoded") else to_bytes(body)
+        headers.append(("Content-Length", str(len(body))))
+        chunks = [body]
+    return f"{status} {responses.get(status, '')}".rstrip(), headers, chunks
+
+
+def app(environ, start_response):
+    """WSGI entry point."""
+    from handler import async_lambda_handler
+    from utils.aio import run_sync
+    status, headers, chunks = to_wsgi_response(run_sync(async_lambda_handler(to_event(environ), None)))
+    start_response(status, headers)
+    return chunks
+
+
+# ── ASGI ──
+
+async def _asgi_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    body = b"".join(chunks)
+    return body.decode("utf-8", errors="replace") if body else None
+
+
+async def _lifespan(receive, send):
+    """Warm the worker (imports, Mongo, JWKS) before it reports started."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            load_env()
+            logging.basicConfig(level=logging.INFO, format="%(message)s")
+            from handler import warm_up
+            from utils.aio import offload
+            await offload(warm_up)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def asgi_app(scope, receive, send):
+    """ASGI entry point."""
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    from handler import async_lambda_handler
+    headers = {}
+    for name, value in scope.get("headers", []):
+        headers[name.decode("latin-1").title()] = value.decode("latin-1")
+    event = _event(
+        scope["method"],
+        scope["path"],
+        headers,
+        scope.get("query_string", b"").decode("latin-1"),
+        await _asgi_body(receive),
+    )
+    status, header_list, chunks = to_wsgi_response(await async_lambda_handler(event, None))
+    await send({
+        "type": "http.response.start",
+        "status": int(status.split(" ", 1)[0]),
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in header_list],
+    })
+    for chunk in chunks:
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
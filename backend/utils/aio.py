@@ -0,0 +1,64 @@
+"""
+RAKSHAK Backend — asyncio Helpers
+
+The request path is async (router.Router.dispatch, handler.async_lambda_handler).
+These helpers bridge it to the synchronous world:
+
+  run_sync(coro)  — run a coroutine from sync code on this thread's
+                    persistent event loop (the Lambda entry point, WSGI)
+  offload(fn, …)  — run blocking code without stalling the loop
+
+ASYNC_OFFLOAD decides whether offload() moves work to a thread. On Lambda
+an environment serves one request at a time, so the thread hop buys
+nothing and it defaults to off; everywhere else it defaults to on.
+
+asyncio itself is imported on first use, keeping it out of the import-time
+budget (bench/coldstart.py); handler.warm_up() loads it during init.
+"""
+
+import os
+import atexit
+import weakref
+import threading
+
+ASYNC_OFFLOAD = os.environ.get(
+    "ASYNC_OFFLOAD", "0" if os.environ.get("AWS_LAMBDA_FUNCTION_NAME") else "1"
+) == "1"
+
+_local = threading.local()
+_loops = weakref.WeakSet()
+
+
+def event_loop():
+    """This thread's event loop, created on first use and kept for reuse."""
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        import asyncio
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+        _loops.add(loop)
+    return loop
+
+
+@atexit.register
+def _close_loops():
+    # Close loops of finished threads before interpreter teardown does it badly
+    for loop in list(_loops):
+        if not loop.is_closed() and not loop.is_running():
+            loop.close()
+
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code. The loop persists
+    across calls, so loop-bound clients (Motor, aioboto3) stay warm.
+    """
+    return event_loop().run_until_complete(coro)
+
+
+async def offload(fn, *args, **kwargs):
+    """Await a blocking call, on a worker thread when ASYNC_OFFLOAD is on."""
+    if ASYNC_OFFLOAD:
+        import asyncio
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
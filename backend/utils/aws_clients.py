@@ -0,0 +1,140 @@
+"""
+RAKSHAK Backend — Shared AWS Client Registry
+Keeps one boto3 client per (service, region) alive across warm invocations.
+Callers with a hard deadline (the alert fan-out) ask for a client bounded
+by it: one attempt whose connect + read timeouts fit inside the deadline,
+so a timed-out send cannot keep running behind its caller's back.
+call_async() is the awaitable form: aioboto3 clients (one per event loop)
+when aioboto3 is installed, else the boto3 client through utils.aio.offload.
+"""
+
+import os
+import weakref
+import threading
+import boto3
+from botocore.config import Config
+
+from utils.tracing import instrument_boto_client
+
+_clients = {}
+_lock = threading.Lock()
+_aio_clients = weakref.WeakKeyDictionary()  # event loop -> {(service, region): client}
+_installed = set()  # keys set via set_client(); call_async uses these too
+
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "16"))
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", "2"))
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", "5"))
+
+_DEFAULT_REGIONS = {
+    "ses": "SES_REGION",
+    "s3": "S3_REGION",
+}
+
+
+def split_timeout(timeout):
+    """(connect, read) timeouts that together stay within timeout seconds."""
+    connect = min(AWS_CONNECT_TIMEOUT, timeout / 2)
+    return connect, timeout - connect
+
+
+def _client_config(timeout=None):
+    """
+    Connection-pool and timeout settings shared by every client; with a
+    timeout, a single attempt bounded by it.
+    """
+    if timeout is None:
+        connect, read = AWS_CONNECT_TIMEOUT, AWS_READ_TIMEOUT
+        retries = {"max_attempts": 2, "mode": "standard"}
+    else:
+        connect, read = split_timeout(timeout)
+        retries = {"total_max_attempts": 1, "mode": "standard"}
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        connect_timeout=connect,
+        read_timeout=read,
+        retries=retries,
+    )
+
+
+def _default_region(service):
+    env_var = _DEFAULT_REGIONS.get(service, "AWS_REGION")
+    return os.environ.get(env_var, "us-east-1")
+
+
+def get_client(service, region=None, timeout=None):
+    """
+    Get a pooled boto3 client for a service (lazy, thread-safe singleton).
+    With a timeout (seconds), the client makes one attempt per call and
+    gives up within it; there is one such client per distinct timeout.
+
+    An optional <SERVICE>_ENDPOINT_URL env var (e.g. SES_ENDPOINT_URL)
+    points the client at a local stand-in.
+    """
+    region = region or _default_region(service)
+    if (service, region) in _installed:
+        return _clients[(service, region)]
+    key = (service, region) if timeout is None else (service, region, float(timeout))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = instrument_boto_client(boto3.client(
+                service,
+                region_name=region,
+                endpoint_url=os.environ.get(f"{service.upper()}_ENDPOINT_URL") or None,
+                config=_client_config(timeout),
+            ))
+            _clients[key] = client
+    return client
+
+
+def set_client(service, client, region=None):
+    """Install a client (e.g. a stub) for a service/region."""
+    key = (service, region or _default_region(service))
+    with _lock:
+        _clients[key] = client
+        _installed.add(key)
+
+
+def reset_clients():
+    """Drop all cached clients, sync and async, so the next call builds fresh ones (tests)."""
+    with _lock:
+        _clients.clear()
+        _installed.clear()
+        _aio_clients.clear()
+
+
+async def _aio_client(service, region):
+    """aioboto3 client for the running loop, or None without aioboto3."""
+    try:
+        import aioboto3
+    except ImportError:
+        return None
+    import asyncio
+    clients = _aio_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get((service, region))
+    if client is None:
+        context = aioboto3.Session().client(
+            service,
+            region_name=region,
+            endpoint_url=os.environ.get(f"{service.upper()}_ENDPOINT_URL") or None,
+            config=_client_config(),
+        )
+        # Entered once and kept open for the life of the loop
+        client = instrument_boto_client(await context.__aenter__())
+        clients[(service, region)] = client
+    return client
+
+
+async def call_async(service, operation, region=None, **params):
+    """Await one AWS API call, e.g. await call_async("lambda", "invoke", FunctionName=...)."""
+    region = region or _default_region(service)
+    client = None if (service, region) in _installed else await _aio_client(service, region)
+    if client is not None:
+        return await getattr(client, operation)(**params)
+    from utils.aio import offload
+    return await offload(getattr(get_client(service, region), operation), **params)
@@ -0,0 +1,195 @@
+"""
+RAKSHAK Backend — Per-User Read-Through Cache
+
+Caches small, rarely-changing per-user documents (profile, guardian list)
+so the dashboard and alert sends skip MongoDB on repeat reads, and the
+presigned part URLs of evidence uploads so a resuming client gets the
+same URLs back instead of a fresh batch of signatures. Writers
+invalidate the user's keys after updating MongoDB; CACHE_TTL_SECONDS
+bounds how long any other process can serve a stale copy.
+
+Interchangeable backends (CACHE_BACKEND):
+  - memory: per-process, LRU-bounded to CACHE_MAX_KEYS (default)
+  - redis:  shared by every server worker / Lambda container (REDIS_URL)
+  - none:   caching disabled
+
+Values are stored as JSON, so every read returns a fresh copy that the
+caller may mutate. A cache failure never fails a request.
+
+Each entry also records the data version (utils.conditional) its reader
+saw before loading it. A reader that knows the current version treats an
+entry from another version as a miss, so a copy another process cached
+before a write is never served under the new version's ETag.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from utils.aio import offload
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "60"))
+
+
+def profile_key(user_sub):
+    return f"profile:{user_sub}"
+
+
+def guardians_key(user_sub):
+    return f"guardians:{user_sub}"
+
+
+def presign_key(evidence_id):
+    return f"presign:{evidence_id}"
+
+
+class Cache:
+    """Interface: get/set/delete of JSON-serializable values."""
+
+    # True when calls do network I/O and should run off the event loop
+    blocking = False
+
+    def get(self, key):
+        """Cached value, or None on a miss."""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+
+class NullCache(Cache):
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+
+class MemoryCache(Cache):
+    """In-process TTL cache, LRU-bounded to max_keys."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # key -> (json, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return json.loads(entry[0])
+
+    def set(self, key, value, ttl):
+        raw = json.dumps(value, default=str)
+        with self._lock:
+            self._entries[key] = (raw, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class RedisCache(Cache):
+    """Shared cache in Redis; entries expire server-side."""
+
+    blocking = True
+
+    def __init__(self, url, prefix="rakshak:"):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self._client.set(self.prefix + key, json.dumps(value, default=str), ex=max(1, int(ttl)))
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(self.prefix + k for k in keys))
+
+
+_cache = None
+
+
+def get_cache():
+    """Process-wide cache chosen by CACHE_BACKEND (memory | redis | none)."""
+    global _cache
+    if _cache is None:
+        backend = os.environ.get("CACHE_BACKEND", "memory")
+        if backend == "redis":
+            _cache = RedisCache(os.environ.get("REDIS_URL", "redis://localhost:6379/0"))
+        elif backend == "none":
+            _cache = NullCache()
+        else:
+            _cache = MemoryCache(max_keys=int(os.environ.get("CACHE_MAX_KEYS", "10000")))
+    return _cache
+
+
+def set_cache(cache):
+    """Install a cache (tests); None resets to the configured default."""
+    global _cache
+    _cache = cache
+
+
+async def _call(fn, *args):
+    cache = get_cache()
+    if cache.blocking:
+        return await offload(fn, *args)
+    return fn(*args)
+
+
+async def read_through(key, loader, ttl=None, version=None):
+    """
+    Return the cached value for key, or await loader(), cache and return
+    its result. loader must return a JSON-serializable value (not None).
+    With a version, only an entry cached at that version is a hit.
+    """
+    cache = get_cache()
+    try:
+        entry = await _call(cache.get, key)
+        # Anything else is a miss, including entries written before versions were stored
+        if isinstance(entry, dict) and entry.get("value") is not None \
+                and (version is None or entry.get("version") == version):
+            return entry["value"]
+    except Exception as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+
+    value = await loader()
+    try:
+        entry = {"version": version, "value": value}
+        await _call(cache.set, key, entry, CACHE_TTL_SECONDS if ttl is None else ttl)
+    except Exception as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+    return value
+
+
+async def invalidate(*keys):
+    """Drop keys after the data behind them changed."""
+    try:
+        await _call(get_cache().delete, *keys)
+    except Exception as e:
+        logger.error(f"Cache invalidation failed for {keys}: {e}")
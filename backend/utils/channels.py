@@ -0,0 +1,280 @@
+"""
+RAKSHAK Backend — Notification Channels
+
+A channel delivers one alert to one guardian over one medium. Guardians
+rank their channels with a "channels" list (e.g. ["sms", "email"]); the
+fan-out engine sends on all of them in parallel and records the first
+that succeeds.
+
+  email   — AWS SES (single or templated bulk sends)
+  sms     — HTTP SMS gateway at SMS_GATEWAY_URL
+  webhook — HMAC-signed JSON POST to the guardian's webhookUrl (only when
+            WEBHOOK_SIGNING_SECRET is set, and only to the public address
+            the host resolved to when checked)
+"""
+
+import os
+import hmac
+import json
+import time
+import socket
+import hashlib
+import logging
+import ipaddress
+from urllib.parse import urlsplit
+import requests
+
+from utils.aws_clients import split_timeout
+from utils.email_notify import SES_BULK_SEND, send_alert_email, send_bulk_alert_emails
+from utils.email_templates import alert_fields, get_template
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL_ORDER = ["email", "sms", "webhook"]
+
+# Pooled HTTP connections for the SMS gateway (webhooks pin their address; see _post_pinned)
+_http = requests.Session()
+
+
+def _resolve_webhook(url):
+    """
+    (error, None) if url may not receive webhooks, else (None, (parts,
+    address)). Only https URLs whose host resolves exclusively to public
+    addresses are allowed, so a guardian entry cannot point the backend at
+    loopback, the VPC, or the instance metadata endpoint.
+    """
+    try:
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 443
+    except ValueError:
+        return "webhookUrl is not a valid URL", None
+    if parts.scheme != "https" or not host:
+        return "webhookUrl must be an https:// URL", None
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        return "webhookUrl host does not resolve", None
+    addresses = [info[4][0].split("%", 1)[0] for info in infos]
+    for address in addresses:
+        ip = ipaddress.ip_address(address)
+        if not ip.is_global or ip.is_multicast:
+            return "webhookUrl must point to a public address", None
+    return None, (parts, addresses[0])
+
+
+def webhook_url_error(url):
+    """Why url may not receive webhooks, or None if it may (see _resolve_webhook)."""
+    return _resolve_webhook(url)[0]
+
+
+def _post_pinned(parts, address, body, headers, timeout):
+    """
+    POST to the address the URL's host was validated against, so a DNS
+    answer that changes after the check (rebinding) is never connected to.
+    TLS still verifies the certificate for the hostname (SNI included).
+    Returns the HTTP status.
+    """
+    import certifi
+    import urllib3
+
+    host, port = parts.hostname, parts.port or 443
+    pool = urllib3.HTTPSConnectionPool(
+        address, port,
+        server_hostname=host, assert_hostname=host,
+        cert_reqs="CERT_REQUIRED", ca_certs=certifi.where(),
+        timeout=urllib3.Timeout(connect=timeout[0], read=timeout[1]),
+        retries=False,
+    )
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    try:
+        resp = pool.urlopen(
+            "POST", path, body=body, headers={**headers, "Host": parts.netloc.rpartition("@")[2]},
+            redirect=False, preload_content=True,
+        )
+        return resp.status
+    finally:
+        pool.close()
+
+
+class Channel:
+    """
+    Base channel. Subclasses set `name` and implement target() and send().
+    A send must give up within `timeout`: the fan-out stops waiting then,
+    and a call left running would hold a pool thread and could deliver
+    after being recorded as a timeout (and retried).
+    """
+
+    name = ""
+    supports_batch = False
+
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+
+    @property
+    def http_timeout(self):
+        """requests (connect, read) timeouts within this channel's timeout."""
+        return split_timeout(self.timeout)
+
+    @property
+    def enabled(self):
+        return True
+
+    def target(self, guardian):
+        """Address for this guardian on this channel, or None."""
+        raise NotImplementedError
+
+    def send(self, guardian, alert_data, rendered=None):
+        """Deliver to one guardian; returns {"status": ..., ...}."""
+        raise NotImplementedError
+
+    def send_batch(self, guardians, alert_data):
+        """Deliver to several guardians; results in guardian order."""
+        return [self.send(g, alert_data) for g in guardians]
+
+
+class EmailChannel(Channel):
+    name = "email"
+    supports_batch = SES_BULK_SEND
+
+    def target(self, guardian):
+        return guardian.get("email") or None
+
+    def send(self, guardian, alert_data, rendered=None):
+        return send_alert_email(
+            guardian_email=guardian.get("email", ""),
+            guardian_name=guardian.get("name", "Guardian"),
+            alert_data=alert_data,
+            rendered=rendered,
+            timeout=self.timeout,
+        )
+
+    def send_batch(self, guardians, alert_data):
+        recipients = [(g.get("email", ""), g.get("name", "Guardian")) for g in guardians]
+        return send_bulk_alert_emails(recipients, alert_data, timeout=self.timeout)
+
+
+class SmsChannel(Channel):
+    """
+    POSTs {"to": phone, "message": text} to SMS_GATEWAY_URL with a bearer
+    SMS_GATEWAY_TOKEN; any 2xx counts as accepted by the gateway.
+    """
+
+    name = "sms"
+
+    def __init__(self, url=None, token=None, timeout=5.0):
+        super().__init__(timeout)
+        self.url = url
+        self.token = token
+
+    @property
+    def enabled(self):
+        return bool(self.url)
+
+    def target(self, guardian):
+        return guardian.get("phone") or None
+
+    def send(self, guardian, alert_data, rendered=None):
+        message = get_template("alert.sms.txt").render(
+            guardian_name=guardian.get("name", "Guardian"), **alert_fields(alert_data)
+        ).strip()
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        resp = _http.post(
+            self.url,
+            json={"to": guardian["phone"], "message": message},
+            headers=headers,
+            timeout=self.http_timeout,
+        )
+        if not resp.ok:
+            return {"status": "failed", "error": f"HTTP {resp.status_code}"}
+        try:
+            message_id = resp.json().get("id", "")
+        except ValueError:
+            message_id = ""
+        return {"status": "delivered", "messageId": message_id}
+
+
+class WebhookChannel(Channel):
+    """
+    POSTs the alert as JSON to the guardian's webhookUrl. The receiver can
+    verify X-Rakshak-Signature = "sha256=" + HMAC-SHA256(secret,
+    "<X-Rakshak-Timestamp>.<raw body>").
+    """
+
+    name = "webhook"
+
+    def __init__(self, secret=None, timeout=5.0):
+        super().__init__(timeout)
+        self.secret = secret
+
+    @property
+    def enabled(self):
+        # Unsigned webhooks could be forged by anyone who learns the URL
+        return bool(self.secret)
+
+    def target(self, guardian):
+        return guardian.get("webhookUrl") or None
+
+    def sign(self, timestamp, body):
+        payload = f"{timestamp}.".encode() + body
+        return "sha256=" + hmac.new(self.secret.encode(), payload, hashlib.sha256).hexdigest()
+
+    def send(self, guardian, alert_data, rendered=None):
+        body = json.dumps({
+            "event": "rakshak.alert",
+            "guardian": {
+                "id": str(guardian.get("_id", guardian.get("id", ""))),
+                "name": guardian.get("name", ""),
+            },
+            "alert": alert_data,
+        }, default=str).encode()
+        # Checked again at send time (older entries were never checked), and
+        # the request goes to the address that passed the check
+        error, target = _resolve_webhook(guardian["webhookUrl"])
+        if error:
+            return {"status": "failed", "error": error}
+        timestamp = str(int(time.time()))
+        status = _post_pinned(*target, body, {
+            "Content-Type": "application/json",
+            "X-Rakshak-Timestamp": timestamp,
+            "X-Rakshak-Signature": self.sign(timestamp, body),
+        }, self.http_timeout)
+        if not 200 <= status < 400:
+            return {"status": "failed", "error": f"HTTP {status}"}
+        return {"status": "delivered"}
+
+
+CHANNELS = {
+    "email": EmailChannel(timeout=float(os.environ.get("EMAIL_CHANNEL_TIMEOUT", "5"))),
+    "sms": SmsChannel(
+        url=os.environ.get("SMS_GATEWAY_URL"),
+        token=os.environ.get("SMS_GATEWAY_TOKEN"),
+        timeout=float(os.environ.get("SMS_CHANNEL_TIMEOUT", "4")),
+    ),
+    "webhook": WebhookChannel(
+        secret=os.environ.get("WEBHOOK_SIGNING_SECRET"),
+        timeout=float(os.environ.get("WEBHOOK_CHANNEL_TIMEOUT", "3")),
+    ),
+}
+
+
+def register_channel(channel):
+    """Add or replace a channel (e.g. a stub in tests)."""
+    CHANNELS[channel.name] = channel
+
+
+def guardian_channels(guardian):
+    """Enabled channels this guardian can be reached on, in their ranked order."""
+    ranked = guardian.get("channels") or DEFAULT_CHANNEL_ORDER
+    channels = []
+    for name in ranked:
+        channel = CHANNELS.get(name)
+        if channel is not None and channel.enabled and channel.target(guardian):
+            channels.append(channel)
+    return channels
+
+
+def delivery_method(guardians):
+    """Summary of the channels an alert goes out on, e.g. "email+sms"."""
+    names = {c.name for g in guardians for c in guardian_channels(g)}
+    ordered = [n for n in DEFAULT_CHANNEL_ORDER if n in names] + sorted(names - set(DEFAULT_CHANNEL_ORDER))
+    return "+".join(ordered) or "email"
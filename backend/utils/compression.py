@@ -0,0 +1,137 @@
+"""
+RAKSHAK Backend — Response Compression
+
+Compresses response bodies by Accept-Encoding: brotli when the optional
+`brotli` package is installed and the client accepts it, else gzip.
+Bodies under COMPRESS_MIN_BYTES are sent as-is. Streamed bodies
+(utils.serialize.JSONStream) are read ahead only until they reach that
+size: a shorter stream is sent as plain bytes, a longer one is compressed
+chunk by chunk, so the servers can still write it as it is produced.
+
+The body stays bytes here; only the Lambda edge base64-encodes it
+(handler.lambda_handler).
+"""
+
+import os
+import itertools
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "4"))
+
+
+def negotiate(accept_encoding):
+    """Best supported encoding ("br" or "gzip") for an Accept-Encoding value, or None."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    candidates = (("br",) if brotli is not None else ()) + ("gzip",)
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _compressor(encoding):
+    """(process(chunk) -> bytes, finish() -> bytes) for an encoding."""
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.finish
+    import zlib
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return c.compress, c.flush
+
+
+class CompressedStream:
+    """A stream of body chunks, compressed lazily; bytes() gives the whole body."""
+
+    __slots__ = ("chunks", "encoding")
+
+    def __init__(self, chunks, encoding):
+        self.chunks = chunks
+        self.encoding = encoding
+
+    def __iter__(self):
+        process, finish = _compressor(self.encoding)
+        for chunk in self.chunks:
+            out = process(chunk)
+            if out:
+                yield out
+        yield finish()
+
+    def __bytes__(self):
+        return b"".join(self)
+
+
+def compress(body, encoding):
+    """Compress bytes (returns bytes) or an iterable of chunks (returns a CompressedStream)."""
+    if isinstance(body, bytes):
+        process, finish = _compressor(encoding)
+        return process(body) + finish()
+    return CompressedStream(body, encoding)
+
+
+def _read_ahead(chunks, limit):
+    """
+    (bytes read, rest of the iterator) once at least limit bytes are read,
+    or (the whole body, None) if the stream ends first.
+    """
+    head, size = [], 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            return b"".join(head), chunks
+    return b"".join(head), None
+
+
+def _add_vary(headers, value):
+    vary = headers.get("Vary")
+    headers["Vary"] = f"{vary}, {value}" if vary else value
+
+
+def compress_response(result, accept_encoding):
+    """Compress a route response in place when the client accepts it and it is worth it."""
+    body = result.get("body")
+    headers = result.setdefault("headers", {})
+    if body is None or result.get("isBase64Encoded") or "Content-Encoding" in headers:
+        return result
+    if result.get("statusCode") in (204, 304):
+        return result
+
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if isinstance(body, bytes) and len(body) < COMPRESS_MIN_BYTES:
+        return result
+
+    _add_vary(headers, "Accept-Encoding")
+    encoding = negotiate(accept_encoding)
+    if encoding is None:
+        return result
+    if not isinstance(body, bytes):
+        head, rest = _read_ahead(iter(body), COMPRESS_MIN_BYTES)
+        if rest is None:
+            result["body"] = head
+            return result
+        body = itertools.chain((head,), rest)
+    result["body"] = compress(body, encoding)
+    headers["Content-Encoding"] = encoding
+    return result
@@ -0,0 +1,135 @@
+"""
+RAKSHAK Backend — Data Versions & Conditional GET
+
+Every user has one data_versions document with a counter per data scope:
+
+    {"_id": <user sub>, "profile": 3, "guardians": 7, "alerts": 41}
+
+Writers bump the scope after their write lands. Dashboard reads derive a
+weak ETag from (scope, version, path, query) before running their query,
+so a matching If-None-Match is answered 304 after a single _id lookup.
+
+Reading the version before the query keeps this safe: a write racing the
+read can only make the ETag older than the body, which costs one extra
+200 later, never a stale 304. Routes that serve from utils.cache pass
+current_version() to read_through, so a body cached before the write
+(possibly by another process) is not reused under the newer ETag.
+"""
+
+import hashlib
+import logging
+from contextvars import ContextVar
+
+from db import get_async_collection, get_collection
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSIONS = "data_versions"
+SCOPES = ("profile", "guardians", "alerts")
+
+# Browsers keep the response but revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+# Version the running conditional read's ETag was derived from
+_version = ContextVar("data_version", default=None)
+
+
+def current_version():
+    """The data version behind the current request's ETag, or None outside conditional()."""
+    return _version.get()
+
+
+def _bump_update(scopes):
+    unknown = set(scopes) - set(SCOPES)
+    if unknown:
+        raise ValueError(f"Unknown data scope(s): {', '.join(sorted(unknown))}")
+    return {"$inc": {scope: 1 for scope in scopes}}
+
+
+async def bump(user_sub, *scopes):
+    """Mark the user's data in scopes as changed. Failures are logged, not raised."""
+    try:
+        await get_async_collection(DATA_VERSIONS).update_one(
+            {"_id": user_sub}, _bump_update(scopes), upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Failed to bump {scopes} version for user {user_sub}: {e}")
+
+
+def bump_sync(user_sub, *scopes):
+    """bump() for synchronous callers (the outbox worker)."""
+    try:
+        get_collection(DATA_VERSIONS).update_one({"_id": user_sub}, _bump_update(scopes), upsert=True)
+    except Exception as e:
+        logger.error(f"Failed to bump {scopes} version for user {user_sub}: {e}")
+
+
+async def _read_version(user_sub, scope):
+    doc = await get_async_collection(DATA_VERSIONS).find_one({"_id": user_sub}, {scope: 1})
+    return (doc or {}).get(scope, 0)
+
+
+def _version_tag(scope, version):
+    return f"{scope}.{version}"
+
+
+async def data_version(user_sub, scope):
+    """
+    The user's current version of scope, in the form read_through() takes,
+    for reads that must not be served from a cache entry older than the
+    last write (e.g. the guardians an alert is sent to).
+    """
+    return _version_tag(scope, await _read_version(user_sub, scope))
+
+
+def _header(event, name):
+    name = name.lower()
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def etag_for(event, user_sub, scope, version):
+    """Weak ETag for this user's view of a scope at a version."""
+    query = sorted((event.get("queryStringParameters") or {}).items())
+    digest = hashlib.sha1(f"{user_sub}\n{event.get('path', '')}\n{query}".encode("utf-8")).hexdigest()[:16]
+    return f'W/"{scope}.{version}.{digest}"'
+
+
+def matches(if_none_match, etag):
+    """True if an If-None-Match header value matches etag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+async def conditional(event, user_sub, scope, call):
+    """
+    Answer 304 if the client's copy of scope is current; otherwise run
+    `await call()` and tag a 200 response with the ETag.
+    """
+    version = await _read_version(user_sub, scope)
+    etag = etag_for(event, user_sub, scope, version)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+
+    if matches(_header(event, "If-None-Match"), etag):
+        return {"statusCode": 304, "headers": headers, "body": ""}
+
+    token = _version.set(_version_tag(scope, version))
+    try:
+        result = await call()
+    finally:
+        _version.reset(token)
+    if result.get("statusCode") == 200:
+        result["headers"] = {**(result.get("headers") or {}), **headers}
+    return result
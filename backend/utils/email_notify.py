@@ -3,14 +3,31 @@ RAKSHAK Backend — Email Notification via AWS SES (Free Tier)
 """
 
 import os
+import json
+import hashlib
 import logging
-import boto3
-from botocore.exceptions import ClientError
+import threading
+from botocore.exceptions import BotoCoreError, ClientError
+from utils.aws_clients import get_client
+from utils.email_templates import DEFAULT_LOCALE, alert_fields, render_alert, ses_template_source
 
 logger = logging.getLogger(__name__)
 
+SES_BULK_SEND = os.environ.get("SES_BULK_SEND", "1") == "1"
+SES_BULK_MAX_DESTINATIONS = 50  # SES limit per SendBulkTemplatedEmail call
 
-def send_alert_email(guardian_email, guardian_name, alert_data):
+_ses_templates = set()  # SES template names known to exist
+_ses_template_lock = threading.Lock()
+
+
+def _error_code(e):
+    """SES error code of a ClientError, or the class name of a transport error."""
+    if isinstance(e, ClientError):
+        return e.response["Error"]["Code"]
+    return type(e).__name__
+
+
+def send_alert_email(guardian_email, guardian_name, alert_data, rendered=None, timeout=None):
     """
     Send a distress alert email to a guardian via AWS SES.
 
@@ -18,64 +35,18 @@ def send_alert_email(guardian_email, guardian_name, alert_data):
         guardian_email: Recipient email address
         guardian_name: Guardian's display name
         alert_data: Dict with location, timestamp, detectionType
+        rendered: Optional RenderedAlert shared by all guardians of the alert
+        timeout: Optional hard limit (seconds) for the SES call, no retries
 
     Returns:
         dict with status and message_id
     """
-    ses = boto3.client("ses", region_name=os.environ.get("SES_REGION", "us-east-1"))
+    ses = get_client("ses", timeout=timeout)
     sender = os.environ.get("SES_SENDER_EMAIL", "alerts@rakshak.ai")
 
-    lat = alert_data.get("location", {}).get("lat", "N/A")
-    lng = alert_data.get("location", {}).get("lng", "N/A")
-    timestamp = alert_data.get("timestamp", "Unknown")
-    detection = alert_data.get("detectionType", "unknown").replace("_", " ").title()
-
-    subject = "🚨 RAKSHAK ALERT — Distress Detected"
-
-    body_html = f"""
-    <html>
-    <body style="font-family: Inter, Arial, sans-serif; background: #0b1120; color: #e2e5ea; padding: 32px;">
-        <div style="max-width: 500px; margin: 0 auto; background: #131b2e; border-radius: 12px; padding: 32px; border: 1px solid rgba(255,255,255,0.06);">
-            <h1 style="color: #c06070; font-size: 18px; margin-bottom: 4px;">🚨 DISTRESS ALERT</h1>
-            <p style="color: #8b92a0; font-size: 14px; margin-bottom: 24px;">RAKSHAK has detected a potential distress event.</p>
-
-            <table style="width: 100%; font-size: 14px;">
-                <tr>
-                    <td style="color: #8b92a0; padding: 8px 0;">Detection Type</td>
-                    <td style="color: #e2e5ea; font-weight: 600; text-align: right;">{detection}</td>
-                </tr>
-                <tr>
-                    <td style="color: #8b92a0; padding: 8px 0;">Location</td>
-                    <td style="color: #e2e5ea; font-weight: 600; text-align: right;">{lat}, {lng}</td>
-                </tr>
-                <tr>
-                    <td style="color: #8b92a0; padding: 8px 0;">Time</td>
-                    <td style="color: #e2e5ea; font-weight: 600; text-align: right;">{timestamp}</td>
-                </tr>
-            </table>
-
-            <hr style="border: none; border-top: 1px solid rgba(255,255,255,0.06); margin: 20px 0;" />
-
-            <p style="color: #8b92a0; font-size: 13px;">
-                Dear {guardian_name}, you are receiving this because you are listed as an emergency guardian.
-                Please check on the individual's safety and contact local authorities if needed.
-            </p>
-
-            <p style="color: #5a6070; font-size: 11px; margin-top: 24px;">
-                This is an automated alert from RAKSHAK — AI-Powered Silent Guardian System
-            </p>
-        </div>
-    </body>
-    </html>
-    """
-
-    body_text = (
-        f"RAKSHAK DISTRESS ALERT\n\n"
-        f"Detection: {detection}\n"
-        f"Location: {lat}, {lng}\n"
-        f"Time: {timestamp}\n\n"
-        f"Dear {guardian_name}, please check on the individual's safety."
-    )
+    if rendered is None:
+        rendered = render_alert(alert_data)
+    subject, body_html, body_text = rendered.for_guardian(guardian_name)
 
     try:
         response = ses.send_email(
@@ -93,7 +64,100 @@ def send_alert_email(guardian_email, guardian_name, alert_data):
         logger.info(f"SES email sent to {guardian_email}: {message_id}")
         return {"status": "delivered", "messageId": message_id}
 
-    except ClientError as e:
-        error_code = e.response["Error"]["Code"]
+    except (ClientError, BotoCoreError) as e:
+        error_code = _error_code(e)
         logger.error(f"SES error ({error_code}) sending to {guardian_email}: {e}")
         return {"status": "failed", "error": error_code}
+
+
+def _ensure_ses_template(locale=DEFAULT_LOCALE, timeout=None):
+    """
+    Make sure the alert template exists in SES and return its name. The
+    name carries a hash of the template sources, so editing a template
+    file publishes a new SES template instead of mutating the live one.
+    """
+    parts = {
+        "SubjectPart": ses_template_source("alert.subject.txt", locale).strip(),
+        "HtmlPart": ses_template_source("alert.html", locale),
+        "TextPart": ses_template_source("alert.txt", locale),
+    }
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:12]
+    name = f"rakshak-alert-{locale}-{digest}"
+    if name in _ses_templates:
+        return name
+
+    with _ses_template_lock:
+        if name not in _ses_templates:
+            ses = get_client("ses", timeout=timeout)
+            try:
+                ses.get_template(TemplateName=name)
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "TemplateDoesNotExist":
+                    raise
+                try:
+                    ses.create_template(Template={"TemplateName": name, **parts})
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "AlreadyExists":
+                        raise
+                logger.info(f"SES template {name} created")
+            _ses_templates.add(name)
+    return name
+
+
+def send_bulk_alert_emails(recipients, alert_data, locale=DEFAULT_LOCALE, timeout=None):
+    """
+    Send one alert to several guardians with SES templated bulk sends
+    (one API call per 50 recipients).
+
+    Args:
+        recipients: list of (guardian_email, guardian_name)
+        alert_data: Dict with location, timestamp, detectionType
+        timeout: Optional hard limit (seconds) for each SES call, no retries
+
+    Returns:
+        list of per-recipient results in recipient order, each with status
+        "delivered" (and messageId) or "failed" (and error). Callers retry
+        failed entries with send_alert_email.
+    """
+    ses = get_client("ses", timeout=timeout)
+    sender = os.environ.get("SES_SENDER_EMAIL", "alerts@rakshak.ai")
+    try:
+        template_name = _ensure_ses_template(locale, timeout=timeout)
+    except (ClientError, BotoCoreError) as e:
+        error_code = _error_code(e)
+        logger.error(f"SES template setup failed ({error_code}): {e}")
+        return [{"status": "failed", "error": error_code} for _ in recipients]
+
+    default_data = json.dumps({k: str(v) for k, v in alert_fields(alert_data).items()})
+    results = []
+    for start in range(0, len(recipients), SES_BULK_MAX_DESTINATIONS):
+        chunk = recipients[start:start + SES_BULK_MAX_DESTINATIONS]
+        try:
+            response = ses.send_bulk_templated_email(
+                Source=sender,
+                Template=template_name,
+                DefaultTemplateData=default_data,
+                Destinations=[
+                    {
+                        "Destination": {"ToAddresses": [email]},
+                        "ReplacementTemplateData": json.dumps({"guardian_name": name}),
+                    }
+                    for email, name in chunk
+                ],
+            )
+        except (ClientError, BotoCoreError) as e:
+            error_code = _error_code(e)
+            logger.error(f"SES bulk send failed ({error_code}) for {len(chunk)} recipient(s): {e}")
+            results.extend({"status": "failed", "error": error_code} for _ in chunk)
+            continue
+
+        statuses = response.get("Status", [])
+        for i, (email, _) in enumerate(chunk):
+            entry = statuses[i] if i < len(statuses) else {"Status": "NoStatus"}
+            if entry.get("Status", "Success") == "Success" and entry.get("MessageId"):
+                results.append({"status": "delivered", "messageId": entry["MessageId"], "mode": "bulk"})
+            else:
+                error_code = entry.get("Status", "Unknown")
+                logger.warning(f"SES bulk send to {email} failed: {error_code} {entry.get('Error', '')}")
+                results.append({"status": "failed", "error": error_code, "mode": "bulk"})
+    return results
@@ -0,0 +1,122 @@
+"""
+RAKSHAK Backend — Alert Email Templates
+
+Templates live in templates/<locale>/ and use {{ field }} placeholders.
+Each file is parsed once into literal chunks and field slots; rendering is
+a single join. bind() fills the fields shared by every guardian of an alert
+once, leaving only {{ guardian_name }} for the per-guardian render.
+"""
+
+import os
+import re
+import html
+import functools
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+DEFAULT_LOCALE = "en"
+
+_FIELD_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class Template:
+    """
+    Pre-parsed template. `parts` alternates literal text (even indices)
+    and field names (odd indices).
+    """
+
+    __slots__ = ("parts", "escape", "source")
+
+    def __init__(self, source, escape=False, parts=None):
+        self.source = source
+        self.escape = escape
+        self.parts = parts if parts is not None else _FIELD_RE.split(source)
+
+    @property
+    def fields(self):
+        return set(self.parts[1::2])
+
+    def _value(self, value):
+        value = str(value)
+        return html.escape(value) if self.escape else value
+
+    def bind(self, **values):
+        """Return a template with the given fields filled in and literals merged."""
+        parts = [self.parts[0]]
+        for i in range(1, len(self.parts), 2):
+            name, literal = self.parts[i], self.parts[i + 1]
+            if name in values:
+                parts[-1] += self._value(values[name]) + literal
+            else:
+                parts.extend((name, literal))
+        return Template(self.source, self.escape, parts)
+
+    def render(self, **values):
+        """Render with every remaining field taken from values ('' if absent)."""
+        parts = self.parts
+        if len(parts) == 1:
+            return parts[0]
+        out = list(parts)
+        for i in range(1, len(out), 2):
+            out[i] = self._value(values.get(out[i], ""))
+        return "".join(out)
+
+
+@functools.lru_cache(maxsize=None)
+def get_template(name, locale=DEFAULT_LOCALE):
+    """Load and parse templates/<locale>/<name>, falling back to the default locale."""
+    path = os.path.join(TEMPLATE_DIR, locale, name)
+    if not os.path.exists(path) and locale != DEFAULT_LOCALE:
+        path = os.path.join(TEMPLATE_DIR, DEFAULT_LOCALE, name)
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return Template(source, escape=name.endswith(".html"))
+
+
+class RenderedAlert:
+    """Subject/HTML/text for one alert with only the guardian name left open."""
+
+    __slots__ = ("subject", "html", "text")
+
+    def __init__(self, subject, html_template, text_template):
+        self.subject = subject
+        self.html = html_template
+        self.text = text_template
+
+    def for_guardian(self, guardian_name):
+        """Returns (subject, body_html, body_text) for one guardian."""
+        return (
+            self.subject,
+            self.html.render(guardian_name=guardian_name),
+            self.text.render(guardian_name=guardian_name),
+        )
+
+
+def ses_template_source(name, locale=DEFAULT_LOCALE):
+    """
+    Template source in SES (Handlebars) syntax. HTML fields stay {{x}} so
+    SES escapes them; plain-text fields use {{{x}}} to avoid escaping.
+    """
+    template = get_template(name, locale)
+    replacement = r"{{\1}}" if template.escape else r"{{{\1}}}"
+    return _FIELD_RE.sub(replacement, template.source)
+
+
+def alert_fields(alert_data):
+    """Template values shared by every guardian of an alert."""
+    location = alert_data.get("location", {})
+    return {
+        "lat": location.get("lat", "N/A"),
+        "lng": location.get("lng", "N/A"),
+        "timestamp": alert_data.get("timestamp", "Unknown"),
+        "detection": alert_data.get("detectionType", "unknown").replace("_", " ").title(),
+    }
+
+
+def render_alert(alert_data, locale=DEFAULT_LOCALE):
+    """Bind the alert-level fields once; call for_guardian() per recipient."""
+    fields = alert_fields(alert_data)
+    return RenderedAlert(
+        get_template("alert.subject.txt", locale).render(**fields).strip(),
+        get_template("alert.html", locale).bind(**fields),
+        get_template("alert.txt", locale).bind(**fields),
+    )
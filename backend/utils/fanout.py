@@ -0,0 +1,183 @@
+"""
+RAKSHAK Backend — Concurrent Guardian Notification Fan-out
+
+Every guardian is notified on all of their channels (utils/channels.py) in
+parallel. Each send is bounded by its channel's timeout and the whole
+fan-out by one per-alert deadline. The first successful channel per
+guardian is what counts as "delivered".
+"""
+
+import os
+import time
+import logging
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.channels import guardian_channels
+from utils.email_templates import render_alert
+
+logger = logging.getLogger(__name__)
+
+FANOUT_MAX_WORKERS = int(os.environ.get("ALERT_FANOUT_WORKERS", "8"))
+ALERT_DEADLINE_SECONDS = float(os.environ.get("ALERT_DEADLINE_SECONDS", "8"))
+
+# Shared across warm invocations — never shut down with wait=True, so a slow
+# send past the deadline cannot hold the request open.
+_executor = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS, thread_name_prefix="fanout")
+
+
+def _submit(fn, *args):
+    """Run fn on the pool inside the caller's context, so sends count toward its trace."""
+    return _executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _guardian_id(g):
+    """Stable identifier for a guardian in the delivery results."""
+    if g.get("_id") is not None:
+        return str(g["_id"])
+    return g.get("id", "")
+
+
+def _timed(started, fn, *args):
+    """Run one send; never raises, stamps latency since fan-out start."""
+    try:
+        result = fn(*args)
+    except Exception as e:
+        logger.error(f"Notification send raised: {e}")
+        result = {"status": "failed", "error": type(e).__name__}
+    latency_ms = int((time.monotonic() - started) * 1000)
+    for r in (result if isinstance(result, list) else [result]):
+        r["latencyMs"] = latency_ms
+    return result
+
+
+def _await(tasks, deadline):
+    """
+    Wait until every task is done or past its expiry (channel timeout,
+    capped by the overall deadline). Returns the set of expired tasks.
+    """
+    pending = set(tasks)
+    expired = set()
+    while pending:
+        now = time.monotonic()
+        for future in [f for f in pending if tasks[f]["expires"] <= now]:
+            pending.discard(future)
+            expired.add(future)
+        if not pending:
+            break
+        timeout = min(tasks[f]["expires"] for f in pending) - now
+        done, _ = wait(pending, timeout=max(0, timeout), return_when=FIRST_COMPLETED)
+        pending -= done
+    for future in expired:
+        future.cancel()
+    return expired
+
+
+def _summarize(guardian, channel_results):
+    """Collapse per-channel outcomes into one delivery entry for a guardian."""
+    entry = {
+        "guardianId": _guardian_id(guardian),
+        "email": guardian.get("email", ""),
+        "name": guardian.get("name", "Guardian"),
+        "channels": channel_results,
+    }
+    delivered = [
+        (r["latencyMs"], name, r) for name, r in channel_results.items()
+        if r.get("status") == "delivered"
+    ]
+    if delivered:
+        latency_ms, name, first = min(delivered, key=lambda x: x[0])
+        entry.update({"status": "delivered", "channel": name, "latencyMs": latency_ms})
+        if first.get("messageId"):
+            entry["messageId"] = first["messageId"]
+    elif not channel_results:
+        entry.update({"status": "failed", "error": "NoChannel"})
+    elif any(r.get("status") == "timeout" for r in channel_results.values()):
+        entry["status"] = "timeout"
+    else:
+        entry.update({"status": "failed", "error": next(iter(channel_results.values())).get("error")})
+    return entry
+
+
+def notify_guardians(guardians, alert_data, deadline_seconds=None):
+    """
+    Notify all guardians on all of their channels under one overall deadline.
+
+    Batch-capable channels (SES bulk email) send once for every guardian
+    on that channel; recipients the batch did not reach are retried with
+    single sends within the remaining deadline.
+
+    Args:
+        guardians: Guardian documents (email/name, optional phone, webhookUrl, channels)
+        alert_data: Dict with location, timestamp, detectionType
+        deadline_seconds: Overall budget for the fan-out (default ALERT_DEADLINE_SECONDS)
+
+    Returns:
+        list of per-guardian delivery results, in guardian order, with the
+        first successful "channel" and every channel's outcome under
+        "channels". Sends still running at their timeout are "timeout".
+    """
+    if not guardians:
+        return []
+    if deadline_seconds is None:
+        deadline_seconds = ALERT_DEADLINE_SECONDS
+    started = time.monotonic()
+    deadline = started + deadline_seconds
+
+    # Alert-level template fields are rendered once for every guardian
+    rendered = render_alert(alert_data)
+    outcomes = [{} for _ in guardians]  # per guardian: channel name -> result
+
+    by_channel = {}
+    for i, g in enumerate(guardians):
+        for channel in guardian_channels(g):
+            by_channel.setdefault(channel.name, (channel, []))[1].append(i)
+
+    def submit_singles(tasks, channel, indexes):
+        for i in indexes:
+            future = _submit(_timed, started, channel.send, guardians[i], alert_data, rendered)
+            tasks[future] = {"channel": channel, "indexes": [i],
+                             "expires": min(deadline, time.monotonic() + channel.timeout)}
+
+    tasks = {}
+    for channel, indexes in by_channel.values():
+        if channel.supports_batch and len(indexes) > 1:
+            batch = [guardians[i] for i in indexes]
+            future = _submit(_timed, started, channel.send_batch, batch, alert_data)
+            tasks[future] = {"channel": channel, "indexes": indexes, "batch": True,
+                             "expires": min(deadline, started + channel.timeout)}
+        else:
+            submit_singles(tasks, channel, indexes)
+
+    retries = {}
+    timed_out = 0
+    for round_tasks in (tasks, retries):
+        expired = _await(round_tasks, deadline)
+        for future, task in round_tasks.items():
+            name = task["channel"].name
+            if future in expired:
+                timed_out += 1
+                latency_ms = int((time.monotonic() - started) * 1000)
+                for i in task["indexes"]:
+                    outcomes[i].setdefault(name, {"status": "timeout", "latencyMs": latency_ms})
+                continue
+            results = future.result()
+            if not task.get("batch"):
+                outcomes[task["indexes"][0]][name] = results
+                continue
+            if not isinstance(results, list):
+                # The whole batch raised (_timed returned one failure): every
+                # recipient counts as missed and gets a single send
+                results = [dict(results) for _ in task["indexes"]]
+            missed = task["indexes"][len(results):]
+            for i, r in zip(task["indexes"], results):
+                if r.get("status") == "delivered":
+                    outcomes[i][name] = r
+                else:
+                    missed.append(i)
+            if missed and round_tasks is tasks:
+                submit_singles(retries, task["channel"], missed)
+
+    if timed_out:
+        logger.warning(f"Fan-out: {timed_out} send(s) hit their channel timeout or the {deadline_seconds}s deadline")
+    return [_summarize(g, channel_results) for g, channel_results in zip(guardians, outcomes)]
@@ -0,0 +1,172 @@
+"""
+RAKSHAK Backend — Idempotency Keys
+
+Makes retried POSTs safe. A request carrying an `Idempotency-Key` header
+claims `{user}:{route}:{key}` in the idempotency_keys collection (the _id
+is the unique index) before the route runs:
+
+  - first request:      runs, and its response is stored with the key
+  - repeat, finished:   gets the stored response back (Idempotent-Replayed: true)
+  - repeat, running:    waits up to IDEMPOTENCY_WAIT_SECONDS for the first
+                        request's response, then 409 with Retry-After
+  - key reused with a different body: 422
+
+5xx and 429 responses are not stored; the key is released so the client
+can retry. A claim whose request died (Lambda timeout, crash) can be taken
+over once its IDEMPOTENCY_LOCK_SECONDS lease has passed. Records expire
+through a TTL index after IDEMPOTENCY_TTL_SECONDS.
+"""
+
+import os
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from db import get_async_collection
+from utils.serialize import dumps, to_text
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEYS = "idempotency_keys"
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_LOCK_SECONDS = float(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "35"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", "10"))
+
+MAX_KEY_LENGTH = 255
+# Polling backoff while a duplicate waits for the first request
+_POLL_START = 0.05
+_POLL_MAX = 0.5
+
+
+def idempotency_key(event):
+    """The request's Idempotency-Key header, or None."""
+    headers = event.get("headers") or {}
+    for name, value in headers.items():
+        if name.lower() == "idempotency-key":
+            return (value or "").strip() or None
+    return None
+
+
+def request_hash(event):
+    """Fingerprint of what the key promises to repeat: route and body."""
+    raw = f"{event.get('httpMethod', '')} {event.get('resource', '')}\n{event.get('body') or ''}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _error(status, message, headers=None):
+    return {"statusCode": status, "headers": headers or {}, "body": dumps({"message": message})}
+
+
+def _replay(stored):
+    return {
+        "statusCode": stored["statusCode"],
+        "headers": {**(stored.get("headers") or {}), "Idempotent-Replayed": "true"},
+        "body": stored.get("body"),
+    }
+
+
+async def idempotent(event, user_sub, call):
+    """
+    Run `await call()` at most once per Idempotency-Key. Requests without
+    the header run unchanged.
+    """
+    key = idempotency_key(event)
+    if key is None:
+        return await call()
+    if len(key) > MAX_KEY_LENGTH:
+        return _error(400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+    import asyncio
+
+    keys = get_async_collection(IDEMPOTENCY_KEYS)
+    record_id = f"{user_sub}:{event.get('httpMethod', '')} {event.get('resource', '')}:{key}"
+    fingerprint = request_hash(event)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+    delay = _POLL_START
+
+    while True:
+        now = datetime.now(timezone.utc)
+        lease = now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+        try:
+            await keys.insert_one({
+                "_id": record_id,
+                "requestHash": fingerprint,
+                "status": "in_progress",
+                "lockedUntil": lease,
+                "expiresAt": now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+            })
+            break
+        except DuplicateKeyError:
+            existing = await keys.find_one({"_id": record_id})
+        if existing is None:
+            continue  # released (or expired) between our insert and read; claim it again
+
+        if existing["requestHash"] != fingerprint:
+            return _error(422, "Idempotency-Key was already used for a different request")
+        if existing["status"] == "done":
+            logger.info(f"Idempotent replay for {record_id}")
+            return _replay(existing["response"])
+
+        # Stored dates come back naive UTC
+        locked_until = existing["lockedUntil"]
+        if locked_until.tzinfo is None:
+            locked_until = locked_until.replace(tzinfo=timezone.utc)
+        if locked_until <= now:
+            # The first request never finished; take over its claim
+            taken = await keys.update_one(
+                {"_id": record_id, "status": "in_progress", "lockedUntil": existing["lockedUntil"]},
+                {"$set": {"lockedUntil": lease}},
+            )
+            if taken.modified_count == 1:
+                logger.warning(f"Took over abandoned idempotency claim {record_id}")
+                break
+            continue
+
+        if loop.time() >= deadline:
+            return _error(
+                409, "A request with this Idempotency-Key is still in progress",
+                {"Retry-After": "1"},
+            )
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, _POLL_MAX)
+
+    try:
+        result = await call()
+    except BaseException:
+        await _release(keys, record_id)
+        raise
+
+    status = result.get("statusCode", 200)
+    if status >= 500 or status == 429:
+        await _release(keys, record_id)
+        return result
+
+    # Stored as the text API Gateway would have sent
+    result["body"] = to_text(result.get("body"))
+    try:
+        await keys.update_one(
+            {"_id": record_id},
+            {"$set": {
+                "status": "done",
+                "response": {
+                    "statusCode": status,
+                    "headers": result.get("headers") or {},
+                    "body": result["body"],
+                },
+            }},
+        )
+    except Exception as e:
+        # The work is done; a failed store only means a retry may repeat it
+        logger.error(f"Failed to store idempotent response for {record_id}: {e}")
+    return result
+
+
+async def _release(keys, record_id):
+    """Drop an in-progress claim so the client can retry."""
+    try:
+        await keys.delete_one({"_id": record_id, "status": "in_progress"})
+    except Exception as e:
+        logger.error(f"Failed to release idempotency claim {record_id}: {e}")
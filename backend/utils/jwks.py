@@ -0,0 +1,143 @@
+"""
+RAKSHAK Backend — Cognito JWKS Key Manager
+
+Serves the cached key set while refreshing it in the background once it
+goes stale, and refetches once (rate-limited) when a token names a kid we
+have not seen, so rotated keys are picked up without waiting for the TTL.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import requests
+from jose import jwk
+
+logger = logging.getLogger(__name__)
+
+JWKS_CACHE_SECONDS = float(os.environ.get("JWKS_CACHE_SECONDS", "3600"))
+JWKS_REFETCH_MIN_SECONDS = float(os.environ.get("JWKS_REFETCH_MIN_SECONDS", "60"))
+JWKS_FETCH_TIMEOUT = float(os.environ.get("JWKS_FETCH_TIMEOUT", "5"))
+
+
+def cognito_jwks_url():
+    """JWKS endpoint of the configured Cognito user pool."""
+    region = os.environ.get("COGNITO_REGION", "us-east-1")
+    pool_id = os.environ.get("COGNITO_USER_POOL_ID", "")
+    return f"https://cognito-idp.{region}.amazonaws.com/{pool_id}/.well-known/jwks.json"
+
+
+class JWKSManager:
+    """
+    Holds parsed JWKS keys (kid -> jose Key) from one source:
+    an in-memory dict (stub), a local JSON file, or the Cognito URL.
+    """
+
+    def __init__(self, url=None, path=None, jwks=None,
+                 ttl=JWKS_CACHE_SECONDS, min_refetch_interval=JWKS_REFETCH_MIN_SECONDS):
+        self.url = url
+        self.path = path
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self._static = jwks
+        self._keys = {}
+        self._fetched_at = 0
+        self._last_forced_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _load(self):
+        """Read the raw JWKS document from the configured source."""
+        if self._static is not None:
+            return self._static
+        if self.path:
+            with open(self.path) as f:
+                return json.load(f)
+        resp = requests.get(self.url, timeout=JWKS_FETCH_TIMEOUT)
+        resp.raise_for_status()
+        return resp.json()
+
+    def refresh(self):
+        """Fetch and parse the key set now (blocking)."""
+        document = self._load()
+        keys = {
+            k["kid"]: jwk.construct(k, algorithm="RS256")
+            for k in document.get("keys", [])
+        }
+        self._keys = keys
+        self._fetched_at = time.time()
+        return keys
+
+    def _refresh_in_background(self):
+        """Start at most one background refresh; failures keep the stale set."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Background JWKS refresh failed, serving stale keys: {e}")
+                # Back off instead of retrying on every request
+                self._fetched_at = time.time() - self.ttl + self.min_refetch_interval
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="jwks-refresh", daemon=True).start()
+
+    def _refetch_for_unknown_kid(self):
+        """Single blocking refetch, at most once per min_refetch_interval."""
+        with self._lock:
+            now = time.time()
+            if now - self._last_forced_at < self.min_refetch_interval:
+                return False
+            self._last_forced_at = now
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"JWKS refetch for unknown kid failed: {e}")
+                return False
+        return True
+
+    def get_key(self, kid):
+        """Return the parsed key for kid, or None if it is not in the set."""
+        if not self._fetched_at:
+            with self._lock:
+                if not self._fetched_at:
+                    self.refresh()
+        elif time.time() - self._fetched_at >= self.ttl:
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and self._refetch_for_unknown_kid():
+            key = self._keys.get(kid)
+        return key
+
+    def prefetch(self):
+        """Load keys ahead of the first request (e.g. during Lambda init)."""
+        if not self._fetched_at:
+            self.refresh()
+
+
+_manager = None
+
+
+def get_jwks_manager():
+    """
+    Process-wide manager. COGNITO_JWKS_FILE switches to a local JWKS file
+    so verification can run offline.
+    """
+    global _manager
+    if _manager is None:
+        path = os.environ.get("COGNITO_JWKS_FILE")
+        _manager = JWKSManager(url=None if path else cognito_jwks_url(), path=path)
+    return _manager
+
+
+def set_jwks_manager(manager):
+    """Install a manager (e.g. JWKSManager(jwks=stub)); None resets to the default."""
+    global _manager
+    _manager = manager
@@ -3,45 +3,88 @@ RAKSHAK Backend — JWT Verification for AWS Cognito tokens
 """
 
 import os
-import json
 import time
-import requests
-from jose import jwk, jwt
-from jose.utils import base64url_decode
+import hashlib
+import threading
+from collections import OrderedDict
+from jose import jwt
+from utils.jwks import get_jwks_manager
 
-_jwks_cache = None
-_jwks_fetched_at = 0
-JWKS_CACHE_SECONDS = 3600  # Re-fetch JWKS every hour
+# Verified-token cache: sha256(token) -> claims, kept until the token's exp
+TOKEN_CACHE_SIZE = int(os.environ.get("JWT_TOKEN_CACHE_SIZE", "1024"))
+_token_cache = OrderedDict()
+_token_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
 
 
-def _get_jwks():
-    """Fetch and cache Cognito JWKS public keys."""
-    global _jwks_cache, _jwks_fetched_at
-    now = time.time()
-    if _jwks_cache and (now - _jwks_fetched_at) < JWKS_CACHE_SECONDS:
-        return _jwks_cache
+def _cache_get(token_hash, count_miss=True):
+    """Return cached claims for a still-valid token, or None."""
+    with _token_lock:
+        claims = _token_cache.get(token_hash)
+        if claims is not None and time.time() < claims.get("exp", 0):
+            _token_cache.move_to_end(token_hash)
+            _cache_stats["hits"] += 1
+            return claims
+        if claims is not None:
+            del _token_cache[token_hash]
+        if count_miss:
+            _cache_stats["misses"] += 1
+        return None
+
+
+def _cache_put(token_hash, claims):
+    with _token_lock:
+        _token_cache[token_hash] = claims
+        _token_cache.move_to_end(token_hash)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+
+def cache_stats():
+    """Hit/miss counters and current size of the verified-token cache."""
+    with _token_lock:
+        return {**_cache_stats, "size": len(_token_cache)}
+
+
+def clear_token_cache():
+    """Drop all cached verifications and reset the counters."""
+    with _token_lock:
+        _token_cache.clear()
+        _cache_stats.update(hits=0, misses=0)
 
-    region = os.environ.get("COGNITO_REGION", "us-east-1")
-    pool_id = os.environ.get("COGNITO_USER_POOL_ID", "")
-    url = f"https://cognito-idp.{region}.amazonaws.com/{pool_id}/.well-known/jwks.json"
-    resp = requests.get(url, timeout=5)
-    resp.raise_for_status()
-    _jwks_cache = resp.json()
-    _jwks_fetched_at = now
-    return _jwks_cache
+
+def _strip_bearer(token):
+    return token[7:] if token.startswith("Bearer ") else token
+
+
+def cached_claims(token):
+    """
+    Claims of a token already verified and not yet expired, or None.
+    Never does I/O or signature checks, so it is safe on the event loop.
+    """
+    if not token:
+        return None
+    # A miss is counted by the verify_token() call that follows
+    return _cache_get(hashlib.sha256(_strip_bearer(token).encode()).hexdigest(), count_miss=False)
 
 
 def verify_token(token):
     """
     Verify a Cognito ID token and return the decoded claims.
-    Raises Exception on invalid/expired tokens.
+    Raises Exception on invalid/expired tokens. May fetch the JWKS
+    (blocking); async callers run it with utils.aio.offload().
     """
     if not token:
         raise ValueError("No token provided")
 
     # Strip 'Bearer ' prefix if present
-    if token.startswith("Bearer "):
-        token = token[7:]
+    token = _strip_bearer(token)
+
+    # A token already verified is trusted until it expires
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    cached = _cache_get(token_hash)
+    if cached is not None:
+        return cached
 
     # Decode header to find key ID
     headers = jwt.get_unverified_headers(token)
@@ -50,12 +93,7 @@ def verify_token(token):
         raise ValueError("Token missing kid header")
 
     # Find matching key
-    jwks = _get_jwks()
-    key = None
-    for k in jwks.get("keys", []):
-        if k["kid"] == kid:
-            key = k
-            break
+    key = get_jwks_manager().get_key(kid)
     if not key:
         raise ValueError("Token key not found in JWKS")
 
@@ -77,4 +115,5 @@ def verify_token(token):
     if time.time() > claims.get("exp", 0):
         raise ValueError("Token has expired")
 
+    _cache_put(token_hash, claims)
     return claims
@@ -0,0 +1,298 @@
+"""
+RAKSHAK Backend — Alert Notification Outbox
+
+handle_simulate_async writes one job per guardian to the alert_outbox collection
+and returns. Workers (worker.py) claim jobs in batches, deliver them through
+the fan-out engine, retry failures with exponential backoff and write each
+guardian's result back onto the alert document.
+
+Job lifecycle: pending -> processing -> delivered | pending (retry) | failed
+"""
+
+import os
+import json
+import uuid
+import random
+import logging
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import ReturnDocument
+from db import get_async_collection, get_collection
+from utils.conditional import bump_sync
+from utils.fanout import ALERT_DEADLINE_SECONDS, notify_guardians
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_COLLECTION = "alert_outbox"
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "25"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_BACKOFF_BASE = float(os.environ.get("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.environ.get("OUTBOX_BACKOFF_MAX", "300"))
+# A worker renews its lease before each alert, so the lease has to cover one
+# alert's fan-out (ALERT_DEADLINE_SECONDS) with room to spare, and outlast a
+# worker Lambda's timeout so claims of a killed worker are not taken over early
+OUTBOX_LEASE_SECONDS = float(os.environ.get("OUTBOX_LEASE_SECONDS", "90"))
+# Time reserved per alert on top of the fan-out deadline (DB writes)
+OUTBOX_ALERT_MARGIN_SECONDS = float(os.environ.get("OUTBOX_ALERT_MARGIN_SECONDS", "2"))
+
+# Used to drain the outbox in-process when no worker function is configured
+_kick_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def backoff_seconds(attempts):
+    """Exponential backoff with full jitter, capped at OUTBOX_BACKOFF_MAX."""
+    return random.uniform(0, min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** attempts)))
+
+
+def _guardian_id(g):
+    return str(g.get("_id", g.get("id", "")))
+
+
+def queued_deliveries(guardians):
+    """Initial per-guardian delivery entries for the alert document."""
+    return [
+        {
+            "guardianId": _guardian_id(g),
+            "email": g.get("email", ""),
+            "name": g.get("name", "Guardian"),
+            "status": "queued",
+        }
+        for g in guardians
+    ]
+
+
+def _jobs(alert_id, user_sub, guardians, alert_data):
+    """One pending job per guardian for an already-stored alert."""
+    now = _now()
+    return [
+        {
+            "alertId": alert_id,
+            "userId": user_sub,
+            "guardianId": _guardian_id(g),
+            "email": g.get("email", ""),
+            "name": g.get("name", "Guardian"),
+            # Snapshot of how this guardian can be reached at alert time
+            "contact": {k: g[k] for k in ("phone", "webhookUrl", "channels") if g.get(k)},
+            "alertData": alert_data,
+            "status": "pending",
+            "attempts": 0,
+            "nextAttemptAt": now,
+            "createdAt": now,
+        }
+        for g in guardians
+    ]
+
+
+async def enqueue_alert_async(alert_id, user_sub, guardians, alert_data):
+    """Write one pending job per guardian for an already-stored alert."""
+    jobs = _jobs(alert_id, user_sub, guardians, alert_data)
+    if jobs:
+        await get_async_collection(OUTBOX_COLLECTION).insert_many(jobs)
+
+
+def kick_worker():
+    """
+    Start draining the outbox right away instead of waiting for the next
+    scheduled sweep: async-invoke OUTBOX_WORKER_FUNCTION when set, else
+    process in a background thread of this process.
+    """
+    function_name = os.environ.get("OUTBOX_WORKER_FUNCTION")
+    try:
+        if function_name:
+            from utils.aws_clients import get_client
+            get_client("lambda").invoke(
+                FunctionName=function_name,
+                InvocationType="Event",
+                Payload=json.dumps({"source": "rakshak.outbox"}).encode(),
+            )
+        else:
+            _kick_executor.submit(drain)
+    except Exception as e:
+        # The scheduled sweep still picks the jobs up
+        logger.error(f"Failed to kick outbox worker: {e}")
+
+
+async def kick_worker_async():
+    """Async form of kick_worker()."""
+    function_name = os.environ.get("OUTBOX_WORKER_FUNCTION")
+    if not function_name:
+        kick_worker()
+        return
+    try:
+        from utils.aws_clients import call_async
+        await call_async(
+            "lambda", "invoke",
+            FunctionName=function_name,
+            InvocationType="Event",
+            Payload=json.dumps({"source": "rakshak.outbox"}).encode(),
+        )
+    except Exception as e:
+        logger.error(f"Failed to kick outbox worker: {e}")
+
+
+def claim_batch(worker_id, limit=OUTBOX_BATCH_SIZE):
+    """Atomically lease up to `limit` due jobs (or jobs whose lease expired)."""
+    outbox = get_collection(OUTBOX_COLLECTION)
+    now = _now()
+    claimed = []
+    while len(claimed) < limit:
+        job = outbox.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "nextAttemptAt": {"$lte": now}},
+                {"status": "processing", "lockedUntil": {"$lt": now}},
+            ]},
+            {"$set": {
+                "status": "processing",
+                "lockedBy": worker_id,
+                "lockedUntil": now + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+            }},
+            sort=[("nextAttemptAt", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            break
+        claimed.append(job)
+    return claimed
+
+
+def _record_result(job, result):
+    """Persist one delivery attempt on the job and on the alert document."""
+    outbox = get_collection(OUTBOX_COLLECTION)
+    attempts = job["attempts"] + 1
+    status = result.get("status")
+
+    if status == "delivered":
+        job_update = {"status": "delivered", "deliveredAt": _now()}
+    elif attempts >= OUTBOX_MAX_ATTEMPTS:
+        job_update = {"status": "failed"}
+    else:
+        job_update = {
+            "status": "pending",
+            "nextAttemptAt": _now() + timedelta(seconds=backoff_seconds(attempts)),
+        }
+    job_update.update({"attempts": attempts, "lastResult": result})
+    outbox.update_one(
+        {"_id": job["_id"], "lockedBy": job["lockedBy"]},
+        {"$set": job_update, "$unset": {"lockedBy": "", "lockedUntil": ""}},
+    )
+
+    delivery = {
+        "guardianId": job["guardianId"],
+        "email": job["email"],
+        "name": job["name"],
+        **result,
+        "status": "retrying" if job_update["status"] == "pending" else job_update["status"],
+        "attempts": attempts,
+    }
+    get_collection("alerts").update_one(
+        {"_id": job["alertId"], "deliveries.guardianId": job["guardianId"]},
+        {"$set": {"deliveries.$": delivery}},
+    )
+
+
+def _settle_alert(alert_id):
+    """Recompute alert status and guardiansNotified from its jobs."""
+    statuses = [j["status"] for j in get_collection(OUTBOX_COLLECTION).find(
+        {"alertId": alert_id}, {"status": 1}
+    )]
+    notified = statuses.count("delivered")
+    if any(s in ("pending", "processing") for s in statuses):
+        status = "processing"
+    elif notified == len(statuses):
+        status = "delivered"
+    elif notified == 0:
+        status = "failed"
+    else:
+        status = "partial"
+    get_collection("alerts").update_one(
+        {"_id": alert_id},
+        {"$set": {"status": status, "guardiansNotified": notified}},
+    )
+
+
+def _renew_lease(worker_id, jobs):
+    """Extend our lease on jobs; returns those still held by this worker."""
+    outbox = get_collection(OUTBOX_COLLECTION)
+    ids = [j["_id"] for j in jobs]
+    mine = {"_id": {"$in": ids}, "status": "processing", "lockedBy": worker_id}
+    outbox.update_many(mine, {"$set": {"lockedUntil": _now() + timedelta(seconds=OUTBOX_LEASE_SECONDS)}})
+    held = {d["_id"] for d in outbox.find(mine, {"_id": 1})}
+    return [j for j in jobs if j["_id"] in held]
+
+
+def release_jobs(worker_id, jobs):
+    """Hand unstarted claimed jobs back to the queue, due immediately."""
+    if not jobs:
+        return
+    get_collection(OUTBOX_COLLECTION).update_many(
+        {"_id": {"$in": [j["_id"] for j in jobs]}, "status": "processing", "lockedBy": worker_id},
+        {"$set": {"status": "pending", "nextAttemptAt": _now()},
+         "$unset": {"lockedBy": "", "lockedUntil": ""}},
+    )
+
+
+def process_batch(worker_id=None, limit=OUTBOX_BATCH_SIZE, time_left=None):
+    """
+    Claim and deliver one batch. Jobs of the same alert go out together
+    through the fan-out engine.
+
+    Args:
+        time_left: optional callable returning the seconds this worker has
+            left (Lambda). Alerts that could not finish in time are released
+            back to the queue unstarted instead of dying with the worker.
+
+    Returns:
+        number of jobs processed
+    """
+    worker_id = worker_id or uuid.uuid4().hex
+    jobs = claim_batch(worker_id, limit)
+    if not jobs:
+        return 0
+
+    by_alert = {}
+    for job in jobs:
+        by_alert.setdefault(job["alertId"], []).append(job)
+
+    processed = 0
+    pending = list(by_alert.items())
+    while pending:
+        if time_left is not None and time_left() < ALERT_DEADLINE_SECONDS + OUTBOX_ALERT_MARGIN_SECONDS:
+            unstarted = [j for _, alert_jobs in pending for j in alert_jobs]
+            release_jobs(worker_id, unstarted)
+            logger.warning(f"Outbox: out of time, released {len(unstarted)} unstarted job(s)")
+            break
+        alert_id, alert_jobs = pending.pop(0)
+        # Jobs whose lease lapsed may already belong to another worker
+        alert_jobs = _renew_lease(worker_id, alert_jobs)
+        if not alert_jobs:
+            continue
+        processed += len(alert_jobs)
+        guardians = [
+            {"id": j["guardianId"], "email": j["email"], "name": j["name"], **j.get("contact", {})}
+            for j in alert_jobs
+        ]
+        results = notify_guardians(guardians, alert_jobs[0]["alertData"])
+        for job, result in zip(alert_jobs, results):
+            result = {k: v for k, v in result.items() if k not in ("guardianId", "email", "name")}
+            _record_result(job, result)
+        _settle_alert(alert_id)
+        bump_sync(alert_jobs[0]["userId"], "alerts")
+        logger.info(f"Outbox: alert {alert_id} processed {len(alert_jobs)} job(s)")
+
+    return processed
+
+
+def drain(worker_id=None, max_batches=10):
+    """Process batches until the outbox has nothing due (or max_batches)."""
+    worker_id = worker_id or uuid.uuid4().hex
+    total = 0
+    for _ in range(max_batches):
+        n = process_batch(worker_id)
+        total += n
+        if n == 0:
+            break
+    return total
@@ -0,0 +1,156 @@
+"""
+RAKSHAK Backend — Token-Bucket Rate Limiting
+
+Two interchangeable backends:
+  - MemoryRateLimiter: per-process, bounded, idle buckets evicted
+  - MongoRateLimiter: shared by every Lambda container / server worker,
+    one atomic findOneAndUpdate per check, expired buckets removed by a
+    TTL index on expiresAt (see indexes.py)
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+
+class Rule:
+    """Bucket of `capacity` tokens refilled at `refill_per_second`."""
+
+    __slots__ = ("capacity", "refill_per_second")
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+
+    @classmethod
+    def per(cls, count, seconds):
+        """`count` requests per `seconds`, allowing a burst of `count`."""
+        return cls(count, count / seconds)
+
+    @property
+    def idle_ttl(self):
+        """Seconds after which an untouched bucket is full again."""
+        return self.capacity / self.refill_per_second
+
+    def __repr__(self):
+        return f"Rule(capacity={self.capacity}, refill_per_second={self.refill_per_second})"
+
+
+def parse_limits(spec):
+    """
+    Parse "POST /alert/simulate=1/10,GET /alert/history=60/60" into
+    {route key: Rule}; each value is <count>/<seconds>.
+    """
+    limits = {}
+    for item in filter(None, (p.strip() for p in (spec or "").split(","))):
+        route_key, _, rate = item.rpartition("=")
+        count, _, seconds = rate.partition("/")
+        limits[route_key.strip()] = Rule.per(int(count), float(seconds))
+    return limits
+
+
+class RateLimiter:
+    """Interface: hit() consumes one token for key under rule."""
+
+    # True when hit() does network I/O and should run off the event loop
+    blocking = False
+
+    def hit(self, key, rule):
+        """
+        Returns:
+            (allowed, retry_after_seconds) — retry_after is 0 when allowed
+        """
+        raise NotImplementedError
+
+
+class MemoryRateLimiter(RateLimiter):
+    """In-process token buckets, LRU-bounded to max_keys."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at, idle_ttl)
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        # Oldest-touched first: stop at the first bucket that is still live
+        while self._buckets:
+            key, (_, updated_at, ttl) = next(iter(self._buckets.items()))
+            if now - updated_at < ttl and len(self._buckets) <= self.max_keys:
+                break
+            self._buckets.popitem(last=False)
+
+    def hit(self, key, rule):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.pop(key, (rule.capacity, now, 0))
+            tokens = min(rule.capacity, tokens + (now - updated_at) * rule.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, rule.idle_ttl)
+            self._evict(now)
+        retry_after = 0 if allowed else (1 - tokens) / rule.refill_per_second
+        return allowed, retry_after
+
+
+class MongoRateLimiter(RateLimiter):
+    """Token buckets in a Mongo collection, updated atomically server-side."""
+
+    blocking = True
+
+    def __init__(self, collection_name="rate_limits"):
+        self.collection_name = collection_name
+
+    def hit(self, key, rule):
+        from pymongo import ReturnDocument
+        from db import get_collection
+
+        now = datetime.now(timezone.utc)
+        capacity, rate = rule.capacity, rule.refill_per_second
+        elapsed = {"$divide": [{"$max": [0, {"$subtract": [now, {"$ifNull": ["$ts", now]}]}]}, 1000]}
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [elapsed, rate]},
+        ]}]}
+        has_token = {"$gte": ["$tokens", 1]}
+
+        doc = get_collection(self.collection_name).find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "ts": now}},
+                {"$set": {
+                    "allowed": has_token,
+                    "tokens": {"$cond": [has_token, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expiresAt": now + timedelta(seconds=rule.idle_ttl),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc["allowed"]:
+            return True, 0
+        return False, (1 - doc["tokens"]) / rate
+
+
+_limiter = None
+
+
+def get_rate_limiter():
+    """Process-wide limiter chosen by RATE_LIMIT_BACKEND (memory | mongo)."""
+    global _limiter
+    if _limiter is None:
+        if os.environ.get("RATE_LIMIT_BACKEND", "memory") == "mongo":
+            _limiter = MongoRateLimiter()
+        else:
+            _limiter = MemoryRateLimiter(
+                max_keys=int(os.environ.get("RATE_LIMIT_MAX_KEYS", "10000"))
+            )
+    return _limiter
+
+
+def set_rate_limiter(limiter):
+    """Install a limiter (tests); None resets to the configured default."""
+    global _limiter
+    _limiter = limiter
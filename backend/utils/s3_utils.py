@@ -1,15 +1,23 @@
 """
 RAKSHAK Backend — S3 Evidence Storage Utilities
+
+Single-PUT presigned uploads for small files, and the multipart calls
+behind routes/evidence.py: the client uploads parts in parallel straight
+to S3 with presigned upload_part URLs, so the API never carries media.
 """
 
 import os
-import boto3
 from botocore.exceptions import ClientError
+from utils.aws_clients import call_async, get_client
 
 
 def get_s3_client():
-    """Get S3 client."""
-    return boto3.client("s3", region_name=os.environ.get("S3_REGION", "us-east-1"))
+    """Get the shared S3 client."""
+    return get_client("s3")
+
+
+def evidence_bucket():
+    return os.environ.get("S3_EVIDENCE_BUCKET", "rakshak-evidence")
 
 
 def generate_presigned_upload_url(user_id, alert_id, file_extension="bin", expires_in=300):
@@ -25,7 +33,7 @@ def generate_presigned_upload_url(user_id, alert_id, file_extension="bin", expir
     Returns:
         dict with upload_url and object_key
     """
-    bucket = os.environ.get("S3_EVIDENCE_BUCKET", "rakshak-evidence")
+    bucket = evidence_bucket()
     object_key = f"evidence/{user_id}/{alert_id}.{file_extension}"
 
     s3 = get_s3_client()
@@ -45,9 +53,79 @@ def generate_presigned_upload_url(user_id, alert_id, file_extension="bin", expir
         raise RuntimeError(f"Failed to generate presigned URL: {e}")
 
 
+async def create_multipart_upload(object_key, content_type):
+    """Start a multipart upload; returns the S3 UploadId."""
+    result = await call_async(
+        "s3", "create_multipart_upload",
+        Bucket=evidence_bucket(),
+        Key=object_key,
+        ContentType=content_type,
+        ServerSideEncryption="AES256",
+    )
+    return result["UploadId"]
+
+
+def presign_upload_parts(object_key, upload_id, part_numbers, expires_in=900):
+    """
+    Pre-signed upload_part URLs, {part number: url}. Signing is local (no
+    AWS call), so the shared boto3 client is used directly.
+    """
+    s3 = get_s3_client()
+    bucket = evidence_bucket()
+    try:
+        return {
+            n: s3.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": bucket, "Key": object_key, "UploadId": upload_id, "PartNumber": n},
+                ExpiresIn=expires_in,
+            )
+            for n in part_numbers
+        }
+    except ClientError as e:
+        raise RuntimeError(f"Failed to generate presigned URL: {e}")
+
+
+async def list_uploaded_parts(object_key, upload_id):
+    """Parts S3 has received so far: [{"partNumber", "etag", "size"}]."""
+    parts, marker = [], 0
+    while True:
+        result = await call_async(
+            "s3", "list_parts",
+            Bucket=evidence_bucket(), Key=object_key, UploadId=upload_id, PartNumberMarker=marker,
+        )
+        parts.extend(
+            {"partNumber": p["PartNumber"], "etag": p["ETag"], "size": p.get("Size", 0)}
+            for p in result.get("Parts", [])
+        )
+        if not result.get("IsTruncated"):
+            return parts
+        marker = result["NextPartNumberMarker"]
+
+
+async def complete_multipart_upload(object_key, upload_id, parts):
+    """Assemble the object from [{"partNumber", "etag"}] (any order)."""
+    ordered = sorted(parts, key=lambda p: p["partNumber"])
+    await call_async(
+        "s3", "complete_multipart_upload",
+        Bucket=evidence_bucket(),
+        Key=object_key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [{"PartNumber": p["partNumber"], "ETag": p["etag"]} for p in ordered]},
+    )
+
+
+async def abort_multipart_upload(object_key, upload_id):
+    """Abort an upload and free its stored parts. An unknown upload is not an error."""
+    try:
+        await call_async("s3", "abort_multipart_upload", Bucket=evidence_bucket(), Key=object_key, UploadId=upload_id)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+            raise
+
+
 def check_s3_ready():
     """Check if the S3 evidence bucket exists and is accessible."""
-    bucket = os.environ.get("S3_EVIDENCE_BUCKET", "rakshak-evidence")
+    bucket = evidence_bucket()
     s3 = get_s3_client()
     try:
         s3.head_bucket(Bucket=bucket)
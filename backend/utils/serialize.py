@@ -0,0 +1,119 @@
+"""
+RAKSHAK Backend — Response Serialization
+
+One JSON encoder for every route response:
+  - orjson when installed, else the stdlib json module (compact output)
+  - ObjectId -> str, datetime -> ISO 8601 (naive values are UTC),
+    Decimal128/Decimal -> number
+  - bodies are produced as bytes once; only the Lambda edge turns them
+    into the str API Gateway expects (see to_text)
+
+JSONStream encodes an object holding one large array lazily, in chunks,
+so the WSGI/ASGI servers can write it as it is produced.
+
+dumps() time counts as the "serialize" phase of the active request trace
+(utils.tracing). Chunks of a JSONStream are encoded after the trace has
+been emitted, so they are not part of it.
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from utils import tracing
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+STREAM_CHUNK_ITEMS = 64
+
+
+def _default(obj):
+    """Encode the BSON / stdlib types json cannot handle natively."""
+    if isinstance(obj, datetime):
+        return (obj if obj.tzinfo else obj.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    # bson types are matched by name so this module never imports bson
+    name = type(obj).__name__
+    if name == "ObjectId":
+        return str(obj)
+    if name == "Decimal128":
+        return float(obj.to_decimal())
+    raise TypeError(f"Object of type {name} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC
+
+    def _encode(obj):
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    _encoder = json.JSONEncoder(default=_default, separators=(",", ":"), ensure_ascii=False)
+
+    def _encode(obj):
+        return _encoder.encode(obj).encode("utf-8")
+
+
+def dumps(obj):
+    """Encode obj as JSON bytes."""
+    trace = tracing.current()
+    if trace is None:
+        return _encode(obj)
+    started = time.perf_counter()
+    try:
+        return _encode(obj)
+    finally:
+        trace.add("serialize", (time.perf_counter() - started) * 1000)
+
+
+class JSONStream:
+    """
+    `{"<key>": [items...], **fields}` encoded lazily. Iterating yields
+    bytes chunks of STREAM_CHUNK_ITEMS items; bytes() gives the whole body.
+    Items may be transformed by `encode_item` as they are written.
+    """
+
+    __slots__ = ("key", "items", "fields", "encode_item")
+
+    def __init__(self, key, items, encode_item=None, **fields):
+        self.key = key
+        self.items = items
+        self.fields = fields
+        self.encode_item = encode_item
+
+    def __iter__(self):
+        yield b'{' + dumps(self.key) + b':['
+        items = self.items
+        for start in range(0, len(items), STREAM_CHUNK_ITEMS):
+            chunk = items[start:start + STREAM_CHUNK_ITEMS]
+            if self.encode_item is not None:
+                chunk = [self.encode_item(item) for item in chunk]
+            # Strip the chunk's own brackets; join chunks with commas
+            yield (b',' if start else b'') + dumps(chunk)[1:-1]
+        tail = dumps(self.fields)
+        yield b']' + (b',' + tail[1:] if len(tail) > 2 else b'}')
+
+    def __bytes__(self):
+        return b"".join(self)
+
+
+def to_bytes(body):
+    """Body of a route response as bytes (str, bytes, JSONStream or None)."""
+    if body is None:
+        return b""
+    if isinstance(body, bytes):
+        return body
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    return bytes(body)
+
+
+def to_text(body):
+    """Body as the str API Gateway expects."""
+    if body is None or isinstance(body, str):
+        return body
+    return to_bytes(body).decode("utf-8")
@@ -0,0 +1,221 @@
+"""
+RAKSHAK Backend — Request Tracing
+
+Each request gets a Trace, held in a context variable, that collects time
+per phase:
+
+  auth      — JWT verification
+  ratelimit — rate-limit check
+  route     — the route handler (includes the phases below)
+  db        — MongoDB commands (pymongo command listener)
+  ses, s3…  — AWS API calls (botocore before-call/after-call hooks)
+  serialize — JSON encoding of response bodies (utils.serialize.dumps);
+              streamed list bodies (JSONStream) are encoded while they are
+              written, after this trace is emitted, and are not included
+  compress  — choosing the encoding and compressing bytes bodies (streamed
+              bodies are compressed lazily, as they are written)
+
+The tracing middleware in handler.py logs one JSON line per request, and
+adds X-Request-Id and Server-Timing headers. With TRACE_EMF=1 that line is
+also a CloudWatch Embedded Metric Format document.
+
+Work submitted to thread pools is attributed to the request only when it
+is submitted through contextvars.copy_context().run (see utils/fanout.py).
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TRACE_SERVER_TIMING = os.environ.get("TRACE_SERVER_TIMING", "1") == "1"
+TRACE_EMF = os.environ.get("TRACE_EMF", "0") == "1"
+TRACE_EMF_NAMESPACE = os.environ.get("TRACE_EMF_NAMESPACE", "Rakshak")
+
+_current = contextvars.ContextVar("rakshak_trace", default=None)
+_cold_start = True
+
+
+class Trace:
+    """Timing for one request: phase name -> [total ms, count]."""
+
+    def __init__(self, request_id, method="", path=""):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.route = ""
+        self.started = time.perf_counter()
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase, ms):
+        # Fan-out threads report into the same trace
+        with self._lock:
+            totals = self.phases.setdefault(phase, [0.0, 0])
+            totals[0] += ms
+            totals[1] += 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms):
+        """Server-Timing header value, e.g. 'auth;dur=1.2, db;dur=3.4;desc="2 ops"'."""
+        entries = []
+        for phase, (ms, count) in self.phases.items():
+            entry = f"{phase};dur={ms:.1f}"
+            if count > 1:
+                entry += f';desc="{count} ops"'
+            entries.append(entry)
+        entries.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(entries)
+
+    def to_record(self, status, total_ms, cold_start=False):
+        return {
+            "requestId": self.request_id,
+            "method": self.method,
+            "route": self.route or self.path,
+            "path": self.path,
+            "status": status,
+            "durationMs": round(total_ms, 2),
+            "coldStart": cold_start,
+            "phases": {
+                phase: {"ms": round(ms, 2), "count": count}
+                for phase, (ms, count) in self.phases.items()
+            },
+        }
+
+
+def current():
+    """The active request's Trace, or None outside a request."""
+    return _current.get()
+
+
+def record(phase, ms):
+    """Add time to a phase of the active request (no-op outside one)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(phase, ms)
+
+
+@contextmanager
+def phase(name):
+    """Time a block as a phase of the active request."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, (time.perf_counter() - started) * 1000)
+
+
+def request_id_for(event):
+    """Caller's X-Request-Id, else API Gateway's request id, else a new one."""
+    headers = event.get("headers") or {}
+    return (
+        headers.get("X-Request-Id")
+        or headers.get("x-request-id")
+        or (event.get("requestContext") or {}).get("requestId")
+        or uuid.uuid4().hex
+    )
+
+
+def start(event):
+    """Begin tracing a request; returns (trace, token for finish())."""
+    trace = Trace(request_id_for(event), event.get("httpMethod", ""), event.get("path", ""))
+    return trace, _current.set(trace)
+
+
+def finish(trace, token, result):
+    """Emit the request's log line / metrics and add response headers."""
+    global _cold_start
+    _current.reset(token)
+    total_ms = trace.elapsed_ms()
+    status = result.get("statusCode", 0)
+
+    headers = result.setdefault("headers", {})
+    headers["X-Request-Id"] = trace.request_id
+    if TRACE_SERVER_TIMING:
+        headers["Server-Timing"] = trace.server_timing(total_ms)
+
+    entry = trace.to_record(status, total_ms, cold_start=_cold_start)
+    _cold_start = False
+    if TRACE_EMF:
+        # EMF must be a bare JSON line on stdout, not a formatted log record
+        sys.stdout.write(json.dumps(_emf(entry)) + "\n")
+        sys.stdout.flush()
+    else:
+        logger.info(json.dumps(entry))
+    return result
+
+
+def _emf(entry):
+    """Wrap a request record as a CloudWatch Embedded Metric Format document."""
+    metrics = [{"Name": "Duration", "Unit": "Milliseconds"}, {"Name": "ServerError", "Unit": "Count"}]
+    doc = dict(entry)
+    doc["Route"] = f"{entry['method']} {entry['route']}"
+    doc["Duration"] = entry["durationMs"]
+    doc["ServerError"] = 1 if entry["status"] >= 500 else 0
+    for name, stats in entry["phases"].items():
+        key = f"{name.capitalize()}Ms"
+        metrics.append({"Name": key, "Unit": "Milliseconds"})
+        doc[key] = stats["ms"]
+    doc["_aws"] = {
+        "Timestamp": int(time.time() * 1000),
+        "CloudWatchMetrics": [{
+            "Namespace": TRACE_EMF_NAMESPACE,
+            "Dimensions": [["Route"]],
+            "Metrics": metrics,
+        }],
+    }
+    return doc
+
+
+# ── Instrumentation hooks ──
+
+def mongo_listener():
+    """
+    pymongo CommandListener recording each command's server round trip
+    under "db". Imported lazily so pymongo stays off the cold-start path.
+    """
+    from pymongo import monitoring
+
+    class MongoCommandTimer(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            record("db", event.duration_micros / 1000)
+
+        def failed(self, event):
+            record("db", event.duration_micros / 1000)
+
+    return MongoCommandTimer()
+
+
+def _before_aws_call(context=None, **kwargs):
+    if context is not None:
+        context["rakshak_started"] = time.perf_counter()
+
+
+def _after_aws_call(model=None, context=None, **kwargs):
+    started = (context or {}).get("rakshak_started")
+    if started is not None and model is not None:
+        record(model.service_model.endpoint_prefix, (time.perf_counter() - started) * 1000)
+
+
+def instrument_boto_client(client):
+    """Time every API call on a boto3 client under its service name (ses, s3, …)."""
+    client.meta.events.register("before-call.*.*", _before_aws_call)
+    client.meta.events.register("after-call.*.*", _after_aws_call)
+    client.meta.events.register("after-call-error.*.*", _after_aws_call)
+    return client
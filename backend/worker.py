@@ -0,0 +1,63 @@
+"""
+RAKSHAK Backend — Alert Outbox Worker
+
+Lambda entry point (scheduled sweep + async kicks from handle_simulate_async):
+    worker.lambda_handler
+
+Long-running process (on-prem / local):
+    python worker.py [--once] [--interval SECONDS]
+"""
+
+import sys
+import time
+import uuid
+import logging
+
+from utils.outbox import process_batch
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Stop claiming new batches when less than this much Lambda time is left
+MIN_REMAINING_MS = 10000
+
+
+def lambda_handler(event, context):
+    """Drain due outbox jobs until none are left or time runs low."""
+    worker_id = getattr(context, "aws_request_id", None) or uuid.uuid4().hex
+    time_left = None
+    if context is not None:
+        time_left = lambda: context.get_remaining_time_in_millis() / 1000
+    processed = 0
+    while True:
+        if context is not None and context.get_remaining_time_in_millis() < MIN_REMAINING_MS:
+            break
+        n = process_batch(worker_id, time_left=time_left)
+        processed += n
+        if n == 0:
+            break
+    logger.info(f"Outbox worker {worker_id}: processed {processed} job(s)")
+    return {"processed": processed}
+
+
+def main(argv=None):
+    """CLI entry point — poll the outbox forever (or once)."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Deliver queued RAKSHAK alert notifications")
+    parser.add_argument("--once", action="store_true", help="drain due jobs once and exit")
+    parser.add_argument("--interval", type=float, default=1.0, help="idle poll interval in seconds")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    worker_id = uuid.uuid4().hex
+    while True:
+        n = process_batch(worker_id)
+        if n == 0:
+            if args.once:
+                return 0
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
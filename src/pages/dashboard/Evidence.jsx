@@ -11,8 +11,9 @@ export default function Evidence() {
             try {
                 const res = await getHealth()
                 setS3Ready(res.data?.services?.s3 === 'ready')
-            } catch {
-                setS3Ready(false)
+            } catch (err) {
+                // A 503 (MongoDB down) still reports S3 in its body
+                setS3Ready(err.response?.data?.services?.s3 === 'ready')
             } finally {
                 setLoading(false)
             }
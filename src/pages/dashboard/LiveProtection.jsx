@@ -8,7 +8,7 @@ import {
     ShieldCheck, ShieldOff, Mic, Camera, Eye, EyeOff,
     CheckCircle, XCircle, Clock, AlertTriangle, Loader, MapPin, Volume2, Activity
 } from 'lucide-react'
-import { simulateAlert } from '../../services/api'
+import { newIdempotencyKey, simulateAlert } from '../../services/api'
 import useVoiceDetection from '../../hooks/useVoiceDetection'
 import useScreamDetection from '../../hooks/useScreamDetection'
 import useGestureDetection from '../../hooks/useGestureDetection'
@@ -67,13 +67,15 @@ export default function LiveProtection() {
             confidence: Math.round(confidence * 100) / 100,
         }
 
-        // Retry logic (3 attempts with exponential backoff)
+        // Retry logic (3 attempts with exponential backoff); every attempt
+        // carries the same key so the backend sends this alert only once
+        const idempotencyKey = newIdempotencyKey()
         let attempts = 0
         const maxAttempts = 3
 
         while (attempts < maxAttempts) {
             try {
-                await simulateAlert(alertPayload)
+                await simulateAlert(alertPayload, idempotencyKey)
                 
                 // Success!
                 setAlertsSent((n) => n + 1)
@@ -32,6 +32,8 @@ export default function SimulateAlert() {
                 status: res.data?.status || 'delivered',
                 location: `${mockLocation.lat.toFixed(4)}, ${mockLocation.lng.toFixed(4)}`,
                 guardiansNotified: res.data?.guardiansNotified || 0,
+                // Outbox mode: notifications are sent after the response
+                guardiansQueued: res.data?.guardiansQueued || 0,
             })
         } catch (err) {
             setError(err.response?.data?.message || 'Alert simulation failed. Is the backend configured?')
@@ -105,10 +107,17 @@ export default function SimulateAlert() {
                                 {result.status.toUpperCase()}
                             </span>
                         </div>
-                        <div className="simulate-result__item">
-                            <span className="simulate-result__label">Guardians Notified</span>
-                            <span className="simulate-result__value">{result.guardiansNotified}</span>
-                        </div>
+                        {result.status === 'queued' ? (
+                            <div className="simulate-result__item">
+                                <span className="simulate-result__label">Guardians Being Notified</span>
+                                <span className="simulate-result__value">{result.guardiansQueued}</span>
+                            </div>
+                        ) : (
+                            <div className="simulate-result__item">
+                                <span className="simulate-result__label">Guardians Notified</span>
+                                <span className="simulate-result__value">{result.guardiansNotified}</span>
+                            </div>
+                        )}
                     </div>
                 )}
             </div>
@@ -27,8 +27,40 @@ export const updateGuardian = (id, data) => api.put(`/user/guardians/${id}`, dat
 export const deleteGuardian = (id) => api.delete(`/user/guardians/${id}`)
 
 // ── Alerts ──
-export const simulateAlert = (data) => api.post('/alert/simulate', data)
-export const getAlertHistory = () => api.get('/alert/history')
+// Reuse one idempotencyKey across retries of the same alert so a lost
+// response never triggers a second alert (see backend/utils/idempotency.py)
+export const newIdempotencyKey = () =>
+    globalThis.crypto?.randomUUID?.() ?? `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+export const simulateAlert = (data, idempotencyKey = newIdempotencyKey()) =>
+    api.post('/alert/simulate', data, { headers: { 'Idempotency-Key': idempotencyKey } })
+export const getAlertHistory = (params) => api.get('/alert/history', { params })
+export const getNearbyAlerts = (params) => api.get('/alert/nearby', { params })
+
+// ── Evidence (multipart uploads straight to S3) ──
+export const startEvidenceUpload = (data) => api.post('/evidence', data)
+export const getEvidenceUploads = (params) => api.get('/evidence', { params })
+export const resumeEvidenceUpload = (id) => api.get(`/evidence/${id}`)
+export const completeEvidenceUpload = (id, parts) => api.post(`/evidence/${id}/complete`, parts ? { parts } : {})
+export const abortEvidenceUpload = (id) => api.delete(`/evidence/${id}`)
+
+// PUT each missing part to its presigned URL, `concurrency` at a time, then complete.
+// Pass an existing evidenceId to resume after a dropped connection.
+export async function uploadEvidence(alertId, blob, { evidenceId, extension = 'bin', concurrency = 4 } = {}) {
+    const { data: session } = evidenceId
+        ? await resumeEvidenceUpload(evidenceId)
+        : await startEvidenceUpload({ alertId, size: blob.size, contentType: blob.type || 'application/octet-stream', extension })
+    const queue = [...session.parts]
+    const worker = async () => {
+        for (let part = queue.shift(); part; part = queue.shift()) {
+            const start = (part.partNumber - 1) * session.partSize
+            const res = await fetch(part.url, { method: 'PUT', body: blob.slice(start, start + session.partSize) })
+            if (!res.ok) throw new Error(`Part ${part.partNumber} failed: ${res.status}`)
+        }
+    }
+    await Promise.all(Array.from({ length: Math.min(concurrency, queue.length) }, worker))
+    const { data } = await completeEvidenceUpload(session.evidenceId)
+    return data
+}
 
 // ── System ──
 export const getHealth = () => api.get('/health')